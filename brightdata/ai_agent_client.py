@@ -3,13 +3,37 @@ Example client for integrating with your fetch AI agent
 This shows how to use the Amazon Product Scraper API from your AI agent
 """
 
-import requests
+import httpx
 import json
 from typing import List, Dict, Optional
 
+# Optional: orjson serializes the request body faster than httpx's json= path
+try:
+    import orjson
+except Exception:  # pragma: no cover
+    orjson = None  # type: ignore
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
 class AmazonProductScraperClient:
     def __init__(self, api_base_url: str = "http://localhost:8000"):
         self.api_base_url = api_base_url
+        # One pooled client so repeated calls reuse keep-alive connections
+        self._client = httpx.Client(
+            base_url=api_base_url,
+            timeout=httpx.Timeout(30.0, connect=5.0, pool=None),
+            limits=httpx.Limits(max_keepalive_connections=20, max_connections=100)
+        )
+    
+    def close(self):
+        """Close the underlying connection pool"""
+        self._client.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
     
     def scrape_products(
         self, 
@@ -30,26 +54,26 @@ class AmazonProductScraperClient:
         Returns:
             Dictionary with scraped product data
         """
-        payload = {
-            "keywords": keywords,
-            "min_rating": min_rating,
-            "max_price": max_price,
-            "limit": limit
-        }
-        
-        # Remove None values
-        payload = {k: v for k, v in payload.items() if v is not None}
+        # Only send the filters that were given; the API applies defaults for the rest
+        payload = {"keywords": keywords}
+        if min_rating is not None:
+            payload["min_rating"] = min_rating
+        if max_price is not None:
+            payload["max_price"] = max_price
+        if limit is not None:
+            payload["limit"] = limit
         
         try:
-            response = requests.post(
-                f"{self.api_base_url}/scrape",
-                json=payload,
-                timeout=30
-            )
+            if orjson is not None:
+                response = self._client.post("/scrape", content=orjson.dumps(payload), headers=JSON_HEADERS)
+                response.raise_for_status()
+                return orjson.loads(response.content)
+            
+            response = self._client.post("/scrape", json=payload)
             response.raise_for_status()
             return response.json()
             
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             return {
                 "success": False,
                 "error": f"API request failed: {str(e)}",
@@ -107,48 +131,47 @@ def example_ai_agent_integration():
     """
     Example of how your fetch AI agent can use this scraper
     """
-    scraper = AmazonProductScraperClient()
-    
-    # Example 1: Get top-rated products
-    print("🔍 Fetching top-rated products...")
-    top_products = scraper.get_top_products(["tap", "wrench"], top_n=3)
-    
-    for product in top_products:
-        print(f"⭐ {product['title']}")
-        print(f"   Price: {product['price']}")
-        print(f"   Rating: {product['rating']}")
-        print(f"   Link: {product['link']}")
-        print()
-    
-    # Example 2: Get affordable products
-    print("💰 Fetching affordable products...")
-    affordable_products = scraper.get_affordable_products(["tap", "wrench"], max_price=30.0)
-    
-    for product in affordable_products:
-        print(f"💵 {product['title']}")
-        print(f"   Price: {product['price']}")
-        print(f"   Rating: {product['rating']}")
-        print()
-    
-    # Example 3: Custom search with specific criteria
-    print("🎯 Custom search with specific criteria...")
-    custom_result = scraper.scrape_products(
-        keywords=["tap", "wrench"],
-        min_rating=4.5,  # Very high rating
-        max_price=25.0,  # Budget-friendly
-        limit=5
-    )
-    
-    if custom_result.get("success"):
-        products = custom_result.get("products", [])
-        print(f"Found {len(products)} products matching criteria:")
+    with AmazonProductScraperClient() as scraper:
+        # Example 1: Get top-rated products
+        print("🔍 Fetching top-rated products...")
+        top_products = scraper.get_top_products(["tap", "wrench"], top_n=3)
         
-        for product in products:
-            print(f"🎯 {product['title']}")
+        for product in top_products:
+            print(f"⭐ {product['title']}")
             print(f"   Price: {product['price']}")
             print(f"   Rating: {product['rating']}")
-            print(f"   Reviews: {product.get('review_count', 'N/A')}")
+            print(f"   Link: {product['link']}")
             print()
+        
+        # Example 2: Get affordable products
+        print("💰 Fetching affordable products...")
+        affordable_products = scraper.get_affordable_products(["tap", "wrench"], max_price=30.0)
+        
+        for product in affordable_products:
+            print(f"💵 {product['title']}")
+            print(f"   Price: {product['price']}")
+            print(f"   Rating: {product['rating']}")
+            print()
+        
+        # Example 3: Custom search with specific criteria
+        print("🎯 Custom search with specific criteria...")
+        custom_result = scraper.scrape_products(
+            keywords=["tap", "wrench"],
+            min_rating=4.5,  # Very high rating
+            max_price=25.0,  # Budget-friendly
+            limit=5
+        )
+        
+        if custom_result.get("success"):
+            products = custom_result.get("products", [])
+            print(f"Found {len(products)} products matching criteria:")
+            
+            for product in products:
+                print(f"🎯 {product['title']}")
+                print(f"   Price: {product['price']}")
+                print(f"   Rating: {product['rating']}")
+                print(f"   Reviews: {product.get('review_count', 'N/A')}")
+                print()
 
 # Integration function for your AI agent
 def fetch_products_for_ai_agent(keywords: List[str], criteria: Dict = None) -> Dict:
@@ -162,8 +185,6 @@ def fetch_products_for_ai_agent(keywords: List[str], criteria: Dict = None) -> D
     Returns:
         Dictionary with product data and metadata
     """
-    scraper = AmazonProductScraperClient()
-    
     # Default criteria
     default_criteria = {
         "min_rating": 4.0,
@@ -175,7 +196,8 @@ def fetch_products_for_ai_agent(keywords: List[str], criteria: Dict = None) -> D
     if criteria:
         default_criteria.update(criteria)
     
-    result = scraper.scrape_products(keywords, **default_criteria)
+    with AmazonProductScraperClient() as scraper:
+        result = scraper.scrape_products(keywords, **default_criteria)
     
     # Format response for AI agent
     if result.get("success"):
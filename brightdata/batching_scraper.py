@@ -0,0 +1,73 @@
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from brightdata_service import BrightDataService
+
+logger = logging.getLogger(__name__)
+
+class BatchingScraper:
+    """Collects keywords from concurrent /scrape calls and searches each unique keyword once"""
+
+    def __init__(self, service: BrightDataService, window_ms: int = 50, max_batch: int = 10):
+        self.service = service
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def search_products(self, keywords: List[str]) -> Dict[str, Any]:
+        """Same contract as BrightDataService.search_products"""
+        loop = asyncio.get_running_loop()
+        futures = [loop.create_future() for _ in keywords]
+        self._pending.extend(zip(keywords, futures))
+
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.window, self._flush)
+
+        # Shielded so one caller disconnecting doesn't cancel keywords shared with others
+        results = await asyncio.gather(
+            *[asyncio.shield(fut) for fut in futures],
+            return_exceptions=True
+        )
+        return self.service.merge_results(keywords, results)
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        task = asyncio.create_task(self._run_batch(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch: List[Tuple[str, asyncio.Future]]):
+        # Demultiplex: every caller waiting on a keyword gets the same result
+        waiters: Dict[str, List[asyncio.Future]] = {}
+        for keyword, fut in batch:
+            waiters.setdefault(keyword, []).append(fut)
+
+        logger.info(f"Batched {len(batch)} keyword requests into {len(waiters)} searches")
+
+        keywords = list(waiters)
+        results = await asyncio.gather(
+            *[self.service.search_products([keyword]) for keyword in keywords],
+            return_exceptions=True
+        )
+
+        for keyword, result in zip(keywords, results):
+            for fut in waiters[keyword]:
+                if fut.done():
+                    continue
+                if isinstance(result, BaseException):
+                    fut.set_exception(result)
+                    fut.exception()  # Mark retrieved; the caller's gather still sees it
+                else:
+                    fut.set_result(result)
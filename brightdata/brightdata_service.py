@@ -1,12 +1,116 @@
+import asyncio
+import contextlib
+import importlib.util
+import random
+import re
 import httpx
 import logging
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 
+from product_filter import parse_price
+
+# Optional: orjson parses large snapshot payloads several times faster than json
+try:
+    import orjson
+except Exception:  # pragma: no cover
+    orjson = None  # type: ignore
+    import json
+
 logger = logging.getLogger(__name__)
 
+BRIGHTDATA_BASE_URL = "https://api.brightdata.com"
+
+# httpx only speaks HTTP/2 when the optional `h2` package is installed
+H2_AVAILABLE = importlib.util.find_spec("h2") is not None
+ORJSON_AVAILABLE = orjson is not None
+
+# Snapshot polling schedule
+POLL_INITIAL_DELAY = 1.0  # First re-check after ~1 second
+POLL_MAX_DELAY = 15.0     # Never wait more than 15 seconds between polls
+POLL_DEADLINE = 600.0     # Give up after 10 minutes of wall-clock time
+
+# Candidate source fields for each Product field, in priority order
+TITLE_KEYS = ('title', 'name')
+LINK_KEYS = ('url', 'link', 'product_link')
+IMAGE_KEYS = ('image', 'image_url', 'thumbnail', 'product_image', 'img')
+PRICE_KEYS = ('price', 'price_text')
+ASIN_KEYS = ('asin', 'product_id')
+
+# Text fields resolved by first truthy candidate key
+TEXT_SCHEMA = {
+    'title': TITLE_KEYS,
+    'link': LINK_KEYS,
+    'image': IMAGE_KEYS,
+    'price': PRICE_KEYS,
+    'asin': ASIN_KEYS,
+}
+
+# Compiled once; used for every item in a snapshot
+_RATING_RE = re.compile(r'\d+(?:[.,]\d+)?')
+_COUNT_RE = re.compile(r'\d[\d,]*')
+
+# Bodies larger than this are decoded off the event loop
+OFFLOAD_PARSE_BYTES = 256_000
+
+# Maximum keyword searches in flight at once
+MAX_CONCURRENT_SEARCHES = 8
+
+class SnapshotFailedError(Exception):
+    """Bright Data reported the snapshot job as failed"""
+
+def _backoff_delay(delay: float) -> float:
+    """Capped exponential delay plus a little random jitter"""
+    return min(delay, POLL_MAX_DELAY) + random.uniform(0, 0.25 * delay)
+
+def _make_extractor(schema: Dict[str, tuple]):
+    """Resolve the schema once into a mapper that probes each candidate key at most once"""
+    fields = tuple(schema.items())
+    
+    def extract(item: Dict[str, Any]) -> Dict[str, Any]:
+        get = item.get
+        return {field: next(filter(None, map(get, keys)), '') for field, keys in fields}
+    
+    return extract
+
+_extract_text_fields = _make_extractor(TEXT_SCHEMA)
+
+def parse_json(content: bytes) -> Any:
+    """Decode a raw JSON body, preferring orjson when it is installed"""
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+async def parse_json_async(content: bytes) -> Any:
+    """Decode a raw JSON body, moving multi-MB snapshots to a worker thread"""
+    # The decoder holds the GIL either way, but a thread lets the loop keep
+    # switching to other requests; small bodies aren't worth the hand-off
+    if len(content) > OFFLOAD_PARSE_BYTES:
+        return await asyncio.to_thread(parse_json, content)
+    return parse_json(content)
+
+def create_client(api_key: str) -> httpx.AsyncClient:
+    """Build the long-lived, pooled client shared by every Bright Data call"""
+    from config import settings
+    
+    # HTTP/2 multiplexes concurrent keyword searches and snapshot polls over one connection
+    http2 = settings.BRIGHTDATA_HTTP2 and H2_AVAILABLE
+    if settings.BRIGHTDATA_HTTP2 and not H2_AVAILABLE:
+        logger.warning("BRIGHTDATA_HTTP2 is enabled but 'h2' is not installed, using HTTP/1.1")
+    
+    return httpx.AsyncClient(
+        base_url=BRIGHTDATA_BASE_URL,
+        http2=http2,
+        headers={
+            'Authorization': f'Bearer {api_key}',
+            'Content-Type': 'application/json'
+        },
+        timeout=settings.BRIGHTDATA_TIMEOUT,
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=20)
+    )
+
 class BrightDataService:
-    def __init__(self):
+    def __init__(self, client: Optional[httpx.AsyncClient] = None):
         from config import settings
         self.api_key = settings.BRIGHTDATA_API_KEY
         self.endpoint = settings.BRIGHTDATA_ENDPOINT
@@ -14,42 +118,106 @@ class BrightDataService:
         
         if not self.api_key:
             raise ValueError("BRIGHTDATA_API_KEY not found in environment variables")
+        
+        # Shared connection pool; attached by the app on startup
+        self.client = client
+        
+        # Admission control: caps concurrent Bright Data requests across all
+        # keywords and callers; the cap can be changed while requests are waiting
+        self._cond = asyncio.Condition()
+        self._in_flight = 0
+        self._max = MAX_CONCURRENT_SEARCHES
+        
+        # Identical concurrent searches share one Bright Data job
+        self._pending: Dict[str, asyncio.Future] = {}
+    
+    @property
+    def max_in_flight(self) -> int:
+        return self._max
+    
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+    
+    async def set_max_in_flight(self, value: int):
+        """Change the concurrency cap at runtime, waking waiters if it grew"""
+        if value < 1:
+            raise ValueError("max_in_flight must be at least 1")
+        async with self._cond:
+            self._max = value
+            self._cond.notify_all()
+    
+    @contextlib.asynccontextmanager
+    async def _admit(self):
+        """Wait for a free slot, hold it for the duration of the request"""
+        async with self._cond:
+            while self._in_flight >= self._max:
+                await self._cond.wait()
+            self._in_flight += 1
+        try:
+            yield
+        finally:
+            async with self._cond:
+                self._in_flight -= 1
+                self._cond.notify(1)
     
     async def search_products(self, keywords: List[str]) -> Dict[str, Any]:
         """Search for products using Bright Data's Amazon search API"""
-        headers = {
-            'Authorization': f'Bearer {self.api_key}',
-            'Content-Type': 'application/json'
-        }
+        key = ','.join(sorted(keywords))
+        pending = self._pending.get(key)
+        if pending is not None:
+            logger.info(f"Joining in-flight Bright Data search for: {key}")
+            # Shielded so one waiter disconnecting doesn't cancel the shared job
+            return await asyncio.shield(pending)
         
+        fut = asyncio.get_running_loop().create_future()
+        self._pending[key] = fut
+        try:
+            # One request per keyword so jobs run concurrently instead of queuing
+            # behind a single combined job; admission control caps in-flight requests
+            results = await asyncio.gather(
+                *[self._search_one(keyword) for keyword in keywords],
+                return_exceptions=True
+            )
+            result = self.merge_results(keywords, results)
+            fut.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            fut.cancel()
+            raise
+        except Exception as e:
+            fut.set_exception(e)
+            fut.exception()  # Mark retrieved; waiters still receive it
+            raise
+        finally:
+            del self._pending[key]
+    
+    async def _search_one(self, keyword: str) -> Dict[str, Any]:
+        """Trigger a Bright Data search for a single keyword"""
         # User's exact format: {"input":[{"keyword":"light bulb"},{"keyword":"dog toys"}]}
         data = {
-            "input": [{"keyword": keyword} for keyword in keywords]
+            "input": [{"keyword": keyword}]
         }
         
-        logger.info(f"Making Bright Data request with data: {data}")
-        
-        # Use longer timeout since Bright Data scraping can take time
-        timeout = httpx.Timeout(120.0)  # 2 minutes
-        
-        async with httpx.AsyncClient(timeout=timeout) as client:
+        async with self._admit():
+            logger.info(f"Making Bright Data request with data: {data}")
+            
             try:
                 # Send request exactly as the working Python script does
                 logger.info(f"Sending request to: {self.endpoint}")
                 logger.info(f"Request data: {data}")
                 
-                response = await client.post(
+                response = await self.client.post(
                     self.endpoint,
-                    json=data,
-                    headers=headers
+                    json=data
                 )
                 
-                logger.info(f"Bright Data response status: {response.status_code}")
+                logger.info(f"Bright Data response status: {response.status_code} ({response.http_version})")
                 
                 # Bright Data returns 202 for async jobs with snapshot_id
                 if response.status_code in [200, 202]:
                     logger.info(f"✅ SUCCESS! Status: {response.status_code}")
-                    result = response.json()
+                    result = parse_json(response.content)
                     
                     # If async (202 or 200 with snapshot_id), we get a snapshot_id
                     snapshot_id = result.get('snapshot_id')
@@ -75,159 +243,184 @@ class BrightDataService:
                 logger.error(f"Bright Data API exception: {str(e)}")
                 raise
     
-    async def _poll_snapshot(self, snapshot_id: str) -> Dict[str, Any]:
-        """Poll Bright Data snapshot until it's ready"""
-        import asyncio
+    def merge_results(self, keywords: List[str], results: List[Any]) -> Dict[str, Any]:
+        """Combine per-keyword responses into the single-response shape parse_products expects"""
+        merged_data = []
+        snapshot_ids = []
+        errors = []
         
-        snapshot_url = f"https://api.brightdata.com/datasets/v3/snapshot/{snapshot_id}"
-        headers = {
-            'Authorization': f'Bearer {self.api_key}',
-            'Content-Type': 'application/json'
-        }
+        for keyword, result in zip(keywords, results):
+            if isinstance(result, BaseException):
+                logger.warning(f"Bright Data search failed for '{keyword}': {str(result)}")
+                errors.append(result)
+            elif isinstance(result, dict) and result.get('snapshot_id'):
+                snapshot_ids.append(result['snapshot_id'])
+            elif isinstance(result, dict) and 'data' in result:
+                merged_data.extend(result['data'])
+            else:
+                merged_data.append(result)
         
-        max_attempts = 30  # Poll for up to 30 attempts
-        poll_interval = 5  # Wait 5 seconds between polls
+        if errors and len(errors) == len(results):
+            # Nothing succeeded - let the caller fall back
+            raise errors[0]
         
-        async with httpx.AsyncClient(timeout=httpx.Timeout(300.0)) as client:
-            for attempt in range(1, max_attempts + 1):
-                try:
-                    logger.info(f"Polling snapshot (attempt {attempt}/{max_attempts})...")
-                    
-                    response = await client.get(snapshot_url, headers=headers)
+        if snapshot_ids and not merged_data:
+            return {"snapshot_id": snapshot_ids[0], "snapshot_ids": snapshot_ids}
+        
+        if snapshot_ids:
+            logger.info(f"Pending snapshots not included in results: {snapshot_ids}")
+        
+        return {"data": merged_data}
+    
+    async def _poll_snapshot(self, snapshot_id: str) -> Dict[str, Any]:
+        """Poll Bright Data snapshot until it's ready or the deadline passes"""
+        try:
+            return await asyncio.wait_for(
+                self._poll_until_ready(snapshot_id),
+                timeout=POLL_DEADLINE
+            )
+        except asyncio.TimeoutError:
+            raise Exception("Timeout waiting for snapshot to complete")
+    
+    async def _poll_until_ready(self, snapshot_id: str) -> Dict[str, Any]:
+        """Poll with exponential backoff + jitter (1s, 2s, 4s, ... capped at 15s)"""
+        snapshot_url = f"/datasets/v3/snapshot/{snapshot_id}"
+        
+        delay = POLL_INITIAL_DELAY
+        attempt = 0
+        
+        while True:
+            attempt += 1
+            try:
+                logger.info(f"Polling snapshot (attempt {attempt})...")
+                
+                response = await self.client.get(snapshot_url)
+                
+                logger.info(f"Snapshot status: {response.status_code}")
+                
+                if response.status_code == 200:
+                    data = await parse_json_async(response.content)
                     
-                    logger.info(f"Snapshot status: {response.status_code}")
+                    # Check if snapshot is ready
+                    status = data.get('status', 'unknown')
+                    logger.info(f"Snapshot status: {status}")
                     
-                    if response.status_code == 200:
-                        data = response.json()
-                        
-                        # Check if snapshot is ready
-                        status = data.get('status', 'unknown')
-                        logger.info(f"Snapshot status: {status}")
-                        
-                        if status in ['ready', 'complete', 'done']:
-                            logger.info("✅ Snapshot is ready!")
-                            return data
-                        elif status in ['failed', 'error']:
-                            logger.error(f"❌ Snapshot failed: {data}")
-                            raise Exception(f"Snapshot failed with status: {status}")
-                        else:
-                            logger.info(f"Snapshot still processing (status: {status}), waiting...")
-                            await asyncio.sleep(poll_interval)
-                    elif response.status_code == 202:
-                        logger.info("Snapshot still processing, waiting...")
-                        await asyncio.sleep(poll_interval)
+                    if status in ['ready', 'complete', 'done']:
+                        logger.info("✅ Snapshot is ready!")
+                        return data
+                    elif status in ['failed', 'error']:
+                        logger.error(f"❌ Snapshot failed: {data}")
+                        raise SnapshotFailedError(f"Snapshot failed with status: {status}")
                     else:
-                        logger.warning(f"Unexpected status {response.status_code}: {response.text[:200]}")
-                        await asyncio.sleep(poll_interval)
-                        
-                except httpx.HTTPStatusError as e:
-                    logger.warning(f"HTTP error polling snapshot: {e}")
-                    await asyncio.sleep(poll_interval)
-                except Exception as e:
-                    logger.error(f"Error polling snapshot: {str(e)}")
-                    await asyncio.sleep(poll_interval)
-        
-        raise Exception("Timeout waiting for snapshot to complete")
+                        logger.info(f"Snapshot still processing (status: {status}), waiting...")
+                elif response.status_code == 202:
+                    logger.info("Snapshot still processing, waiting...")
+                elif response.status_code >= 500:
+                    logger.warning(f"Transient error {response.status_code} polling snapshot, retrying...")
+                else:
+                    logger.warning(f"Unexpected status {response.status_code}: {response.text[:200]}")
+                    
+            except SnapshotFailedError:
+                raise
+            except httpx.HTTPError as e:
+                logger.warning(f"HTTP error polling snapshot: {e}")
+            except Exception as e:
+                logger.error(f"Error polling snapshot: {str(e)}")
+            
+            await asyncio.sleep(_backoff_delay(delay))
+            delay = min(delay * 2, POLL_MAX_DELAY)
     
-    def parse_products(self, raw_data: Dict[str, Any], keywords: List[str]) -> List:
+    def parse_products(self, raw_data: Any, keywords: List[str]) -> List:
         """Parse raw API response and extract product information"""
-        from models import Product
-        import json
-        
-        # Check if this is a snapshot_id response (not product data yet)
-        if 'snapshot_id' in raw_data:
-            logger.warning("Received snapshot_id - results are not yet ready")
-            return []  # Return empty for now, user needs to poll the snapshot
+        if isinstance(raw_data, dict):
+            # A snapshot_id response carries no product data yet; the caller polls for it
+            if 'snapshot_id' in raw_data:
+                return []
+            
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Raw response keys: {list(raw_data.keys())}")
+            search_results = raw_data.get('data', ())
+            bare_list = False
+        else:
+            # Snapshot bodies can be a bare JSON array of result records
+            search_results = raw_data if isinstance(raw_data, list) else ()
+            bare_list = True
         
         products = []
         
-        try:
-            # Debug: Log the raw response structure
-            logger.info(f"Raw response keys: {list(raw_data.keys())}")
-            
-            # Navigate through the response structure
-            search_results = raw_data
-            
-            # Process each keyword's results
-            if 'data' in search_results:
-                for keyword_data in search_results['data']:
-                    if isinstance(keyword_data, dict) and 'results' in keyword_data:
-                        keyword_results = keyword_data['results']
-                    elif isinstance(keyword_data, list):
-                        keyword_results = keyword_data
-                    else:
-                        continue
-                    
-                    for item in keyword_results:
-                        try:
-                            product = self._extract_product_data(item)
-                            if product:
-                                products.append(product)
-                        except Exception as e:
-                            logger.warning(f"Failed to parse product item: {str(e)}")
-                            continue
-            
-            logger.info(f"Successfully parsed {len(products)} products")
-            return products
+        # Process each keyword's results
+        for keyword_data in search_results:
+            if isinstance(keyword_data, dict) and 'results' in keyword_data:
+                keyword_results = keyword_data['results']
+            elif isinstance(keyword_data, list):
+                keyword_results = keyword_data
+            elif bare_list and isinstance(keyword_data, dict):
+                keyword_results = (keyword_data,)
+            else:
+                continue
             
-        except Exception as e:
-            logger.error(f"Error parsing product data: {str(e)}")
-            return []
+            for item in keyword_results:
+                try:
+                    product = self._extract_product_data(item)
+                    if product:
+                        products.append(product)
+                except Exception as e:
+                    logger.warning(f"Failed to parse product item: {str(e)}")
+                    continue
+        
+        logger.info(f"Successfully parsed {len(products)} products")
+        return products
     
     def _extract_product_data(self, item: Dict[str, Any]):
         """Extract product data from a single item"""
-        from models import Product
+        from models import ProductCore
         
         try:
-            title = item.get('title', item.get('name', ''))
-            link = item.get('url', item.get('link', item.get('product_link', '')))
+            fields = _extract_text_fields(item)
+            if not fields['title'] or not fields['link']:
+                return None
             
-            # Try multiple possible image fields
-            image = item.get('image', None)
-            if not image:
-                image = item.get('image_url', None)
-            if not image:
-                image = item.get('thumbnail', None)
-            if not image:
-                image = item.get('product_image', None)
-            if not image:
-                image = item.get('img', None)
-            if not image:
-                image = ''  # Default empty if no image found
+            # ProductCore.to_product skips validation, so coerce raw JSON values here
+            for key in ('title', 'link', 'image', 'asin'):
+                if not isinstance(fields[key], str):
+                    fields[key] = str(fields[key])
             
-            price = item.get('price', item.get('price_text', ''))
+            # Parse the price once here so filtering doesn't have to re-parse the text
+            price = fields['price']
+            if isinstance(price, (int, float)):
+                price_value = float(price)
+                fields['price'] = str(price)
+            else:
+                price = fields['price'] = str(price)
+                price_value = parse_price(price)
             
-            # Extract rating
+            # Extract rating, e.g. "4.5 out of 5 stars"
             rating_raw = item.get('rating', item.get('stars', 0))
             if isinstance(rating_raw, str):
-                try:
-                    rating = float(rating_raw.split()[0])
-                except:
-                    rating = 0.0
+                m = _RATING_RE.search(rating_raw)
+                rating = float(m.group().replace(',', '.')) if m else 0.0
             else:
                 rating = float(rating_raw) if rating_raw else 0.0
             
+            # Extract review count, e.g. "1,234 ratings"
             review_count = item.get('review_count', item.get('reviews', 0))
             if isinstance(review_count, str):
-                try:
-                    review_count = int(review_count.replace(',', '').split()[0])
-                except:
-                    review_count = 0
+                m = _COUNT_RE.search(review_count)
+                review_count = int(m.group().replace(',', '')) if m else 0
+            else:
+                review_count = int(review_count) if review_count else 0
             
-            asin = item.get('asin', item.get('product_id', ''))
             availability = item.get('availability', item.get('in_stock', 'Unknown'))
+            if isinstance(availability, bool):
+                availability = 'In Stock' if availability else 'Out of Stock'
+            elif availability is not None:
+                availability = str(availability)
             
-            if not title or not link:
-                return None
-            
-            return Product(
-                title=title,
-                link=link,
-                image=image,
-                price=price,
+            return ProductCore(
+                **fields,
+                price_value=price_value,
                 rating=rating,
                 review_count=review_count,
-                asin=asin,
                 availability=availability
             )
             
@@ -0,0 +1,66 @@
+import logging
+from typing import List, Optional
+from urllib.parse import urlsplit
+
+# Optional: Redis client (redis-py >= 4.2 ships the asyncio API formerly known as aioredis)
+try:
+    import redis.asyncio as redis
+except Exception:  # pragma: no cover
+    redis = None  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+class CacheService:
+    """Best-effort Redis cache; every operation is a no-op when Redis is unavailable"""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.client = None
+
+    async def connect(self):
+        if redis is None or not self.url:
+            logger.info("Redis cache disabled")
+            return
+
+        try:
+            self.client = redis.from_url(self.url)
+            await self.client.ping()
+            # Host and port only; the URL may carry a password
+            parts = urlsplit(self.url)
+            logger.info(f"Connected to Redis cache at {parts.hostname}:{parts.port or 6379}")
+        except Exception as e:
+            logger.warning(f"Redis unavailable, caching disabled: {str(e)}")
+            self.client = None
+
+    async def close(self):
+        if self.client is not None:
+            await self.client.close()
+            self.client = None
+
+    async def get(self, key: str) -> Optional[bytes]:
+        if self.client is None:
+            return None
+
+        try:
+            return await self.client.get(key)
+        except Exception as e:
+            logger.warning(f"Redis GET failed for {key}: {str(e)}")
+            return None
+
+    async def set(self, key: str, value, ttl: int):
+        if self.client is None:
+            return
+
+        try:
+            await self.client.set(key, value, ex=ttl)
+        except Exception as e:
+            logger.warning(f"Redis SET failed for {key}: {str(e)}")
+
+    @staticmethod
+    def scrape_key(keywords: List[str], min_rating: float, max_price: float, limit: int) -> str:
+        """Canonical key: keyword order must not cause cache misses"""
+        return f"scrape:{','.join(sorted(keywords))}:{min_rating}:{max_price}:{limit}"
+
+    @staticmethod
+    def snapshot_key(snapshot_id: str) -> str:
+        return f"snapshot:{snapshot_id}"
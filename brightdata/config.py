@@ -1,4 +1,5 @@
 import os
+import httpx
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -10,9 +11,24 @@ class Settings:
     # The endpoint should wait for results if notify=false is set
     BRIGHTDATA_ENDPOINT = "https://api.brightdata.com/datasets/v3/trigger?dataset_id=gd_l7q7dkf244hwjntr0&notify=false&include_errors=true&type=discover_new&discover_by=keyword&wait=true"
     
+    # Scrape jobs read for a long time, but connects should fail fast and
+    # requests may wait in the pool as long as needed while keywords are in flight
+    BRIGHTDATA_TIMEOUT = httpx.Timeout(connect=10.0, read=120.0, write=30.0, pool=None)
+    # Requires the `h2` package (pip install "httpx[http2]")
+    BRIGHTDATA_HTTP2 = os.getenv("BRIGHTDATA_HTTP2", "true").lower() == "true"
+    
     MIN_RATING = float(os.getenv("MIN_RATING", "4.0"))
     MAX_PRICE = float(os.getenv("MAX_PRICE", "100.0"))
     TOP_PRODUCTS_LIMIT = int(os.getenv("TOP_PRODUCTS_LIMIT", "5"))
     REQUEST_TIMEOUT = int(os.getenv("REQUEST_TIMEOUT", "30"))
+    
+    # Concurrent /scrape keywords arriving within this window share one search each
+    BATCH_WINDOW_MS = int(os.getenv("BATCH_WINDOW_MS", "50"))
+    BATCH_MAX_KEYWORDS = int(os.getenv("BATCH_MAX_KEYWORDS", "10"))
+    
+    # Leave REDIS_URL empty to disable caching
+    REDIS_URL = os.getenv("REDIS_URL", "")
+    SCRAPE_CACHE_TTL = int(os.getenv("SCRAPE_CACHE_TTL", "120"))  # seconds
+    SNAPSHOT_CACHE_TTL = int(os.getenv("SNAPSHOT_CACHE_TTL", "3600"))  # seconds
 
 settings = Settings()
@@ -1,13 +1,17 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Query
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 import logging
 from datetime import datetime
 from typing import List
+from pydantic import ValidationError
 
-from models import ScrapeRequest, ScrapeResponse, ErrorResponse, Product
-from brightdata_service import BrightDataService
+from models import ScrapeRequest, ScrapeResponse, ErrorResponse, Product, to_response_products, build_scrape_response
+from brightdata_service import BrightDataService, create_client, parse_json_async, ORJSON_AVAILABLE
 from mock_service import MockDataService
+from cache_service import CacheService
+from batching_scraper import BatchingScraper
 from product_filter import ProductFilterService
 from config import settings
 
@@ -22,7 +26,9 @@ logger = logging.getLogger(__name__)
 app = FastAPI(
     title="Amazon Product Scraper API",
     description="API for scraping Amazon products using Bright Data",
-    version="1.0.0"
+    version="1.0.0",
+    # orjson serializes large product lists much faster than the stdlib encoder
+    default_response_class=ORJSONResponse if ORJSON_AVAILABLE else JSONResponse
 )
 
 # Add CORS middleware
@@ -30,14 +36,35 @@ app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # Configure this properly for production
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    # Explicit lists keep cached preflights valid; browsers re-check wildcards
+    allow_methods=["GET", "POST", "PATCH"],
+    allow_headers=["Authorization", "Content-Type"],
+    max_age=86400,  # Cache preflight responses for 24 hours
 )
 
 # Initialize services
 brightdata_service = BrightDataService()
 mock_service = MockDataService()
 filter_service = ProductFilterService()
+cache_service = CacheService(settings.REDIS_URL)
+batching_scraper = BatchingScraper(
+    brightdata_service,
+    window_ms=settings.BATCH_WINDOW_MS,
+    max_batch=settings.BATCH_MAX_KEYWORDS
+)
+
+@app.on_event("startup")
+async def startup():
+    """Open the shared Bright Data connection pool"""
+    app.state.brightdata_client = create_client(settings.BRIGHTDATA_API_KEY)
+    brightdata_service.client = app.state.brightdata_client
+    await cache_service.connect()
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Close the shared Bright Data connection pool"""
+    await app.state.brightdata_client.aclose()
+    await cache_service.close()
 
 @app.get("/")
 async def root():
@@ -62,34 +89,27 @@ async def scrape_products(request: ScrapeRequest):
     """
     Scrape Amazon products based on keywords with filtering options
     """
+    # One timestamp per request, shared by whichever response is returned
+    ts = datetime.now()
+    
     try:
         logger.info(f"Received scrape request for keywords: {request.keywords}")
         
-        # Validate input
-        if not request.keywords:
-            raise HTTPException(status_code=400, detail="Keywords list cannot be empty")
-        
-        if len(request.keywords) > 10:
-            raise HTTPException(status_code=400, detail="Maximum 10 keywords allowed per request")
-        
-        # Use request parameters or defaults
-        min_rating = request.min_rating or settings.MIN_RATING
-        max_price = request.max_price or settings.MAX_PRICE
-        limit = request.limit or settings.TOP_PRODUCTS_LIMIT
+        # Use request parameters or defaults (bounds already validated by ScrapeRequest)
+        min_rating = request.min_rating if request.min_rating is not None else settings.MIN_RATING
+        max_price = request.max_price if request.max_price is not None else settings.MAX_PRICE
+        limit = request.limit if request.limit is not None else settings.TOP_PRODUCTS_LIMIT
         
-        # Validate parameters
-        if min_rating < 0 or min_rating > 5:
-            raise HTTPException(status_code=400, detail="Rating must be between 0 and 5")
-        
-        if max_price <= 0:
-            raise HTTPException(status_code=400, detail="Max price must be greater than 0")
-        
-        if limit <= 0 or limit > 50:
-            raise HTTPException(status_code=400, detail="Limit must be between 1 and 50")
+        # Serve identical recent queries from cache
+        cache_key = CacheService.scrape_key(request.keywords, min_rating, max_price, limit)
+        cached = await cache_service.get(cache_key)
+        if cached:
+            logger.info(f"Cache hit for {cache_key}")
+            return ScrapeResponse.parse_raw(cached)
         
         # Step 1: Search products using Bright Data API (with fallback to mock data)
         try:
-            raw_data = await brightdata_service.search_products(request.keywords)
+            raw_data = await batching_scraper.search_products(request.keywords)
             
             # Check if we got a snapshot_id (async job)
             if isinstance(raw_data, dict) and 'snapshot_id' in raw_data:
@@ -101,16 +121,19 @@ async def scrape_products(request: ScrapeRequest):
                     "success": True,
                     "message": "Scraping job created successfully",
                     "snapshot_id": snapshot_id,
+                    "snapshot_ids": raw_data.get('snapshot_ids', [snapshot_id]),
                     "status": "processing",
                     "fetch_url": f"http://localhost:8000/snapshot/{snapshot_id}",
-                    "timestamp": datetime.now(),
+                    "timestamp": ts,
                     "keywords_used": request.keywords
                 }
             
             all_products = brightdata_service.parse_products(raw_data, request.keywords)
+            from_brightdata = True
             logger.info("Using Bright Data API")
         except Exception as e:
             logger.warning(f"Bright Data API failed: {str(e)}, using mock data")
+            from_brightdata = False
             raw_data = await mock_service.search_products(request.keywords)
             all_products = mock_service.parse_products(raw_data, request.keywords)
         
@@ -123,15 +146,19 @@ async def scrape_products(request: ScrapeRequest):
         )
         
         # Step 4: Prepare response
-        response = ScrapeResponse(
+        response = build_scrape_response(
             success=True,
             message=f"Successfully scraped and filtered {len(filtered_products)} products",
-            products=filtered_products,
+            products=to_response_products(filtered_products),
             total_found=len(all_products),
-            timestamp=datetime.now(),
+            timestamp=ts,
             keywords_used=request.keywords
         )
         
+        # Only cache real results so a Bright Data outage isn't served from cache
+        if from_brightdata:
+            await cache_service.set(cache_key, response.json(), settings.SCRAPE_CACHE_TTL)
+        
         logger.info(f"Successfully processed request: {len(filtered_products)} products returned")
         return response
         
@@ -146,7 +173,10 @@ async def scrape_simple(keywords: List[str]):
     """
     Simplified endpoint for quick scraping with default filters
     """
-    request = ScrapeRequest(keywords=keywords)
+    try:
+        request = ScrapeRequest(keywords=keywords)
+    except ValidationError as e:
+        raise RequestValidationError(e.errors())
     return await scrape_products(request)
 
 @app.get("/products/stats")
@@ -163,6 +193,23 @@ async def get_product_stats():
         "api_status": {
             "brightdata_configured": bool(settings.BRIGHTDATA_API_KEY),
             "endpoint": settings.BRIGHTDATA_ENDPOINT
+        },
+        "concurrency": {
+            "max_in_flight": brightdata_service.max_in_flight,
+            "in_flight": brightdata_service.in_flight
+        }
+    }
+
+@app.patch("/products/stats")
+async def update_product_stats(max_in_flight: int = Query(..., ge=1, le=100)):
+    """
+    Tune the Bright Data concurrency cap at runtime
+    """
+    await brightdata_service.set_max_in_flight(max_in_flight)
+    return {
+        "concurrency": {
+            "max_in_flight": brightdata_service.max_in_flight,
+            "in_flight": brightdata_service.in_flight
         }
     }
 
@@ -171,50 +218,55 @@ async def get_snapshot(snapshot_id: str):
     """
     Download and parse snapshot data from Bright Data
     """
+    ts = datetime.now()
+    
     try:
         logger.info(f"Fetching snapshot: {snapshot_id}")
         
-        # Fetch snapshot from Bright Data
-        import httpx
-        headers = {
-            'Authorization': f'Bearer {settings.BRIGHTDATA_API_KEY}',
-            'Content-Type': 'application/json'
-        }
-        
-        snapshot_url = f"https://api.brightdata.com/datasets/v3/snapshot/{snapshot_id}"
+        # Snapshots are immutable once ready, so repeated fetches come from cache
+        cache_key = CacheService.snapshot_key(snapshot_id)
+        cached = await cache_service.get(cache_key)
         
-        async with httpx.AsyncClient(timeout=httpx.Timeout(120.0)) as client:
-            response = await client.get(snapshot_url, headers=headers)
+        if cached:
+            data = await parse_json_async(cached)
+            logger.info("✅ Snapshot data served from cache")
+        else:
+            # Fetch snapshot from Bright Data over the shared connection pool
+            response = await app.state.brightdata_client.get(f"/datasets/v3/snapshot/{snapshot_id}")
             
-            if response.status_code == 200:
-                data = response.json()
-                logger.info(f"✅ Snapshot data fetched successfully")
-                
-                # Parse products from the snapshot
-                all_products = brightdata_service.parse_products(data, [])
-                
-                # Filter and rank products
-                filtered_products = filter_service.filter_and_rank_products(
-                    all_products,
-                    min_rating=settings.MIN_RATING,
-                    max_price=settings.MAX_PRICE,
-                    limit=settings.TOP_PRODUCTS_LIMIT
-                )
-                
-                return ScrapeResponse(
-                    success=True,
-                    message=f"Successfully retrieved {len(filtered_products)} products from snapshot",
-                    products=filtered_products,
-                    total_found=len(all_products),
-                    timestamp=datetime.now(),
-                    keywords_used=[]  # We don't have keywords from snapshot
-                )
-            else:
+            if response.status_code != 200:
                 raise HTTPException(
                     status_code=response.status_code,
                     detail=f"Bright Data snapshot error: {response.text[:200]}"
                 )
-                
+            
+            data = await parse_json_async(response.content)
+            logger.info("✅ Snapshot data fetched successfully")
+        
+        # Parse products from the snapshot
+        all_products = brightdata_service.parse_products(data, [])
+        
+        # Only cache a body that parsed, so a bad one can't fail every later request
+        if not cached:
+            await cache_service.set(cache_key, response.content, settings.SNAPSHOT_CACHE_TTL)
+        
+        # Filter and rank products
+        filtered_products = filter_service.filter_and_rank_products(
+            all_products,
+            min_rating=settings.MIN_RATING,
+            max_price=settings.MAX_PRICE,
+            limit=settings.TOP_PRODUCTS_LIMIT
+        )
+        
+        return build_scrape_response(
+            success=True,
+            message=f"Successfully retrieved {len(filtered_products)} products from snapshot",
+            products=to_response_products(filtered_products),
+            total_found=len(all_products),
+            timestamp=ts,
+            keywords_used=[]  # We don't have keywords from snapshot
+        )
+        
     except HTTPException:
         raise
     except Exception as e:
@@ -1,6 +1,7 @@
 import logging
 from typing import List, Dict, Any
-from models import Product
+from models import ProductCore
+from product_filter import parse_price
 
 logger = logging.getLogger(__name__)
 
@@ -39,15 +40,22 @@ class MockDataService:
                 "availability": "In Stock"
             }
         ]
+        
+        # Titles never change, so lowercase and tokenize them once instead of per search
+        self._titles_lower = [product["title"].lower() for product in self.mock_products]
+        self._title_words = [frozenset(title.split()) for title in self._titles_lower]
     
     async def search_products(self, keywords: List[str]) -> Dict[str, Any]:
         logger.info(f"Using mock data for keywords: {keywords}")
         
-        filtered_products = []
-        for product in self.mock_products:
-            title_lower = product["title"].lower()
-            if any(keyword.lower() in title_lower for keyword in keywords):
-                filtered_products.append(product)
+        keywords_lower = [keyword.lower() for keyword in keywords]
+        # Whole-word hits are a set lookup; the substring check keeps partial
+        # and multi-word keywords matching as before
+        filtered_products = [
+            product
+            for product, title_lower, words in zip(self.mock_products, self._titles_lower, self._title_words)
+            if any(keyword in words or keyword in title_lower for keyword in keywords_lower)
+        ]
         
         if not filtered_products:
             filtered_products = self.mock_products
@@ -61,7 +69,7 @@ class MockDataService:
             ]
         }
     
-    def parse_products(self, raw_data: Dict[str, Any], keywords: List[str]) -> List[Product]:
+    def parse_products(self, raw_data: Dict[str, Any], keywords: List[str]) -> List[ProductCore]:
         products = []
         
         try:
@@ -78,22 +86,16 @@ class MockDataService:
                 else:
                     continue
                 
-                for item in keyword_results:
-                    try:
-                        product = Product(
-                            title=item.get('title', ''),
-                            link=item.get('url', ''),
-                            image=item.get('image', ''),
-                            price=item.get('price', ''),
-                            rating=float(item.get('rating', 0)),
-                            review_count=item.get('review_count', 0),
-                            asin=item.get('asin', ''),
-                            availability=item.get('availability', 'Unknown')
-                        )
-                        products.append(product)
-                    except Exception as e:
-                        logger.warning(f"Failed to parse product item: {str(e)}")
-                        continue
+                # Whole batch in one comprehension; only on failure walk it item
+                # by item so the bad entries can be reported by index
+                try:
+                    products.extend([_to_core(item) for item in keyword_results])
+                except Exception:
+                    for index, item in enumerate(keyword_results):
+                        try:
+                            products.append(_to_core(item))
+                        except Exception as e:
+                            logger.warning(f"Failed to parse product item {index}: {str(e)}")
             
             logger.info(f"Successfully parsed {len(products)} mock products")
             return products
@@ -101,3 +103,18 @@ class MockDataService:
         except Exception as e:
             logger.error(f"Error parsing mock product data: {str(e)}")
             return []
+
+def _to_core(item: Dict[str, Any]) -> ProductCore:
+    # Trusted internal data: a plain slotted record, no pydantic validation
+    price = item.get('price', '')
+    return ProductCore(
+        title=item.get('title', ''),
+        link=item.get('url', ''),
+        image=item.get('image', ''),
+        price=price,
+        price_value=parse_price(price),
+        rating=float(item.get('rating', 0) or 0),
+        review_count=item.get('review_count', 0),
+        asin=item.get('asin', ''),
+        availability=item.get('availability', 'Unknown')
+    )
@@ -1,5 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional
+from dataclasses import dataclass
 from datetime import datetime
 
 class Product(BaseModel):
@@ -8,15 +9,52 @@ class Product(BaseModel):
     image: str
     price: str
     rating: float
+    price_value: Optional[float] = None  # Numeric price parsed from `price`
     review_count: Optional[int] = None
     availability: Optional[str] = None
     asin: Optional[str] = None
 
+# pydantic v2 renamed construct() to model_construct()
+_construct_product = getattr(Product, 'model_construct', None) or Product.construct
+
+@dataclass(slots=True)
+class ProductCore:
+    """Slotted product record for parsing and ranking; only survivors become Product"""
+    title: str
+    link: str
+    image: str
+    price: str
+    rating: float
+    price_value: Optional[float] = None
+    review_count: Optional[int] = None
+    availability: Optional[str] = None
+    asin: Optional[str] = None
+    
+    def to_product(self) -> Product:
+        # Fields were produced by our own parsers, so skip re-validation
+        return _construct_product(
+            title=self.title,
+            link=self.link,
+            image=self.image,
+            price=self.price,
+            rating=self.rating,
+            price_value=self.price_value,
+            review_count=self.review_count,
+            availability=self.availability,
+            asin=self.asin
+        )
+
+def to_response_products(products: List[ProductCore]) -> List[Product]:
+    """Convert internal records to the API model at the response boundary"""
+    return [p.to_product() for p in products]
+
 class ScrapeRequest(BaseModel):
-    keywords: List[str]
-    min_rating: Optional[float] = None
-    max_price: Optional[float] = None
-    limit: Optional[int] = None
+    # Bounds are enforced by pydantic before the handler runs (422 on failure);
+    # fields left as None fall back to the configured defaults
+    keywords: List[str] = Field(..., min_length=1, max_length=10)
+    min_rating: Optional[float] = Field(None, ge=0, le=5)
+    max_price: Optional[float] = Field(None, gt=0)
+    limit: Optional[int] = Field(None, ge=1, le=50)
 
 class ScrapeResponse(BaseModel):
     success: bool
@@ -26,6 +64,14 @@ class ScrapeResponse(BaseModel):
     timestamp: datetime
     keywords_used: List[str]
 
+_construct = getattr(ScrapeResponse, 'model_construct', None) or ScrapeResponse.construct
+
+def build_scrape_response(**fields) -> ScrapeResponse:
+    """Build a ScrapeResponse from server-side data without re-validating it.
+
+    Only for trusted values: products must already be Product instances."""
+    return _construct(**fields)
+
 class ErrorResponse(BaseModel):
     success: bool = False
     error: str
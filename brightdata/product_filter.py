@@ -1,10 +1,115 @@
 import re
+import heapq
 import logging
-from typing import List, Optional
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional
 from models import Product
 
+# Optional: NumPy for vectorized filtering of large product lists
+try:
+    import numpy as np
+except Exception:  # pragma: no cover
+    np = None  # type: ignore
+
+# Optional: Numba compiles the rank kernel so filtering + top-k is a single pass
+try:
+    from numba import njit
+except Exception:  # pragma: no cover
+    njit = None  # type: ignore
+
 logger = logging.getLogger(__name__)
 
+# Strips currency symbols, spaces and other non-numeric characters
+_PRICE_RE = re.compile(r'[^\d.,]+')
+
+# Non-numeric characters that commonly surround a price ("$45.99", "12.50 USD")
+_PRICE_EDGE_CHARS = ' \t\n\xa0$€£¥₹USDEURGBPCAD'
+
+# Below this size the per-call NumPy overhead outweighs the vectorized win
+VECTORIZE_MIN_PRODUCTS = 256
+
+def _rank_top_k(ratings, prices, min_rating, max_price, limit):
+    """Indices of the best `limit` items, ordered like the list-based path.
+
+    Keeps a small sorted buffer instead of materializing and sorting every candidate."""
+    top = np.empty(limit, dtype=np.int64)
+    count = 0
+    for i in range(ratings.shape[0]):
+        rating = ratings[i]
+        price = prices[i]
+        # NaN prices fail this comparison, matching the unparseable-price drop
+        if not (rating >= min_rating and price <= max_price):
+            continue
+        
+        # Insert after everything that ranks ahead (higher rating, or cheaper/equal
+        # at the same rating), so ties keep their original order
+        j = count
+        while j > 0:
+            k = top[j - 1]
+            if ratings[k] > rating or (ratings[k] == rating and prices[k] <= price):
+                break
+            j -= 1
+        if j >= limit:
+            continue
+        
+        if count < limit:
+            count += 1
+        for m in range(count - 1, j, -1):
+            top[m] = top[m - 1]
+        top[j] = i
+    return top[:count]
+
+if np is not None and njit is not None:
+    _rank_top_k = njit(cache=True)(_rank_top_k)
+    # Compile (or load from cache) now rather than on the first large request
+    _rank_top_k(np.zeros(1), np.zeros(1), 0.0, 1.0, 1)
+else:
+    _rank_top_k = None  # type: ignore
+
+@dataclass(slots=True)
+class ProductBatch:
+    """Column (struct-of-arrays) view of a product list for vectorized ranking"""
+    products: List[Product]
+    ratings: Any  # float64[n]
+    prices: Any   # float64[n], NaN where the price couldn't be parsed
+    
+    @classmethod
+    def from_products(
+        cls,
+        products: List[Product],
+        price_of: Callable[[Product], Optional[float]]
+    ) -> "ProductBatch":
+        count = len(products)
+        ratings = np.fromiter((p.rating for p in products), dtype=np.float64, count=count)
+        
+        # Unparseable prices become NaN, which fails every comparison and is dropped
+        prices = np.fromiter(
+            (np.nan if v is None else v for v in map(price_of, products)),
+            dtype=np.float64,
+            count=count
+        )
+        return cls(products, ratings, prices)
+    
+    def top(self, min_rating: float, max_price: float, limit: int) -> List[Product]:
+        """Best `limit` products: highest rating first, then cheapest, ties in input order"""
+        ratings, prices, products = self.ratings, self.prices, self.products
+        
+        if _rank_top_k is not None:
+            return [products[i] for i in _rank_top_k(ratings, prices, min_rating, max_price, limit)]
+        
+        candidates = np.flatnonzero((ratings >= min_rating) & (prices <= max_price))
+        
+        # O(n) partition down to the ratings that can still make the top `limit`
+        # (keeping ties) before the exact ordering below
+        if len(candidates) > limit:
+            neg_ratings = -ratings[candidates]
+            cutoff = np.partition(neg_ratings, limit - 1)[limit - 1]
+            candidates = candidates[neg_ratings <= cutoff]
+        
+        # Highest rating first, then cheapest; lexsort is stable like sorted()
+        order = np.lexsort((prices[candidates], -ratings[candidates]))[:limit]
+        return [products[i] for i in candidates[order]]
+
 class ProductFilterService:
     def __init__(self):
         self.min_rating = 4.0
@@ -21,47 +126,84 @@ class ProductFilterService:
         if not products:
             return []
         
-        min_rating = min_rating or self.min_rating
-        max_price = max_price or self.max_price
-        limit = limit or self.top_limit
+        # Explicit None checks: 0 is a valid min_rating and must not become the default
+        if min_rating is None:
+            min_rating = self.min_rating
+        if max_price is None:
+            max_price = self.max_price
+        if limit is None:
+            limit = self.top_limit
         
         logger.info(f"Filtering {len(products)} products with min_rating={min_rating}, max_price={max_price}")
         
+        if np is not None and len(products) >= VECTORIZE_MIN_PRODUCTS:
+            top_products = self._filter_and_rank_vectorized(products, min_rating, max_price, limit)
+            logger.info(f"Final result: {len(top_products)} top products")
+            return top_products
+        
         filtered_by_rating = [
             product for product in products 
             if product.rating >= min_rating
         ]
         
-        filtered_by_price = []
-        for product in filtered_by_rating:
-            price_value = self._extract_price_value(product.price)
+        # Decorate once with the sort key (price parsed a single time); the
+        # position breaks ties so products themselves are never compared
+        decorated = []
+        for i, product in enumerate(filtered_by_rating):
+            price_value = self._price_of(product)
             if price_value is not None and price_value <= max_price:
-                filtered_by_price.append(product)
+                decorated.append((-product.rating, price_value, i, product))
         
-        sorted_products = sorted(
-            filtered_by_price,
-            key=lambda p: (-p.rating, self._extract_price_value(p.price) or float('inf'))
-        )
-        
-        top_products = sorted_products[:limit]
+        # O(n log limit) partial selection; same result as sorted(...)[:limit]
+        top_products = [t[3] for t in heapq.nsmallest(limit, decorated)]
         
         logger.info(f"Final result: {len(top_products)} top products")
         return top_products
     
+    def _filter_and_rank_vectorized(
+        self,
+        products: List[Product],
+        min_rating: float,
+        max_price: float,
+        limit: int
+    ) -> List[Product]:
+        """Same result as the list-based path, using array comparisons instead of per-item Python"""
+        batch = ProductBatch.from_products(products, self._price_of)
+        return batch.top(min_rating, max_price, limit)
+    
+    def _price_of(self, product: Product) -> Optional[float]:
+        """Use the price parsed at extraction time, parsing the text only if missing"""
+        if product.price_value is not None:
+            return product.price_value
+        return self._extract_price_value(product.price)
+    
     def _extract_price_value(self, price_str: str) -> Optional[float]:
-        if not price_str:
-            return None
-        
+        return parse_price(price_str)
+
+def parse_price(price_str: str) -> Optional[float]:
+    """Numeric value of a price string such as "$1,299.99" or "45,99", or None"""
+    if not price_str:
+        return None
+    
+    # Fast path: plain "digits[.digits]" once the currency/whitespace edges are gone.
+    # This is exactly what the regex would leave, so the value is identical
+    trimmed = price_str.strip(_PRICE_EDGE_CHARS)
+    if trimmed.replace('.', '', 1).isdigit():
         try:
-            price_clean = re.sub(r'[^\d.,]', '', price_str)
-            
-            if ',' in price_clean and '.' in price_clean:
-                price_clean = price_clean.replace(',', '')
-            elif ',' in price_clean and len(price_clean.split(',')[-1]) <= 2:
-                price_clean = price_clean.replace(',', '.')
-            
-            return float(price_clean)
-            
-        except (ValueError, AttributeError):
-            logger.warning(f"Could not extract price from: {price_str}")
-            return None
+            return float(trimmed)
+        except ValueError:
+            pass  # e.g. superscript digits; let the general parser decide
+    
+    try:
+        price_clean = _PRICE_RE.sub('', price_str)
+        
+        if ',' in price_clean and '.' in price_clean:
+            price_clean = price_clean.replace(',', '')
+        elif ',' in price_clean and len(price_clean.split(',')[-1]) <= 2:
+            price_clean = price_clean.replace(',', '.')
+        
+        return float(price_clean)
+        
+    except (ValueError, AttributeError):
+        logger.warning(f"Could not extract price from: {price_str}")
+        return None
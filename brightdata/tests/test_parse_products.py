@@ -0,0 +1,37 @@
+import pytest
+
+pytest.importorskip("pydantic")
+
+from brightdata_service import BrightDataService
+
+ITEM = {"title": "Cordless Drill", "url": "https://www.amazon.com/dp/B000", "price": "$59.99", "rating": 4.5}
+
+
+@pytest.fixture
+def service():
+    # parse_products doesn't touch the HTTP client, so skip __init__
+    return BrightDataService.__new__(BrightDataService)
+
+
+def test_top_level_list_is_treated_as_results(service):
+    products = service.parse_products([ITEM], [])
+    assert [p.title for p in products] == ["Cordless Drill"]
+
+
+def test_keyword_wrapped_results(service):
+    products = service.parse_products({"data": [{"keyword": "drill", "results": [ITEM]}]}, [])
+    assert [p.title for p in products] == ["Cordless Drill"]
+
+
+def test_snapshot_id_and_unknown_bodies_yield_nothing(service):
+    assert service.parse_products({"snapshot_id": "s_123"}, []) == []
+    assert service.parse_products("not json", []) == []
+
+
+def test_raw_values_are_coerced_before_construct(service):
+    item = dict(ITEM, asin=123, in_stock=True, review_count=12.0, image=None)
+    product = service.parse_products([item], [])[0].to_product()
+    assert product.availability == "In Stock"
+    assert product.asin == "123"
+    assert product.review_count == 12
+    assert isinstance(product.image, str)
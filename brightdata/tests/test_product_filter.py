@@ -0,0 +1,34 @@
+import pytest
+
+pytest.importorskip("pydantic")
+
+from models import ProductCore, ScrapeRequest
+from pydantic import ValidationError
+from product_filter import VECTORIZE_MIN_PRODUCTS, ProductFilterService
+
+
+def _product(rating, price_value=10.0):
+    return ProductCore(
+        title="Item", link="https://example.com", image="", price=f"${price_value}",
+        rating=rating, price_value=price_value
+    )
+
+
+@pytest.mark.parametrize("count", [3, VECTORIZE_MIN_PRODUCTS])
+def test_min_rating_zero_keeps_unrated_products(count):
+    products = [_product(0.0) for _ in range(count)]
+    ranked = ProductFilterService().filter_and_rank_products(products, min_rating=0, limit=count)
+    assert len(ranked) == count
+
+
+def test_none_falls_back_to_defaults():
+    products = [_product(3.0), _product(4.5)]
+    ranked = ProductFilterService().filter_and_rank_products(products)
+    assert [p.rating for p in ranked] == [4.5]
+
+
+def test_keyword_count_is_bounded():
+    with pytest.raises(ValidationError):
+        ScrapeRequest(keywords=[])
+    with pytest.raises(ValidationError):
+        ScrapeRequest(keywords=["drill"] * 11)
@@ -1,5 +1,8 @@
 from __future__ import annotations
-from typing import List, Optional, Any
+import os
+from collections import deque
+from typing import Callable, Deque, List, NamedTuple, Optional, Any
+from urllib.parse import quote_plus
 
 # Optional: Anthropic SDK
 try:
@@ -8,6 +11,13 @@ except Exception:  # pragma: no cover
     Anthropic = None  # type: ignore
 
 
+MODEL = "claude-3-5-sonnet-20241022"
+MAX_TOKENS = 1000
+
+# Chat turns kept for context (user + assistant messages); older ones drop off
+MAX_HISTORY_MESSAGES = 40
+
+
 class AnthropicAgent:
     """Anthropic LLM agent for processing user queries and generating responses."""
 
@@ -16,7 +26,9 @@ class AnthropicAgent:
         self.client = None
         if Anthropic is not None and api_key:
             self.client = Anthropic(api_key=api_key)
-        self.conversation_history: List[dict] = []
+        self.conversation_history: Deque[dict] = deque(maxlen=MAX_HISTORY_MESSAGES)
+        # The store list format is mechanical; only ask the LLM to write it when opted in
+        self.use_llm = os.getenv("USE_LLM_FORMATTER", "false").lower() == "true"
 
     def process_hardware_store_query(
         self,
@@ -24,23 +36,28 @@ class AnthropicAgent:
         requirements: List[str],
         hardware_stores: List[Any],
     ) -> str:
-        system_prompt = _create_system_prompt()
-        user_prompt = _create_user_prompt(location, requirements, hardware_stores)
+        # Read each store's fields once; both the prompt and the fallback reuse them
+        top = hardware_stores[:5]
+        getter = _make_getter(top[0]) if top else _get
+        stores = [_extract_store_fields(store, getter) for store in top]
 
-        if self.client is None:
-            return _fallback_format(hardware_stores)
+        if not self.use_llm or self.client is None:
+            return _fallback_format(stores)
+
+        system_prompt = _SYSTEM_PROMPT
+        user_prompt = _create_user_prompt(location, requirements, stores)
 
         try:
             response = self.client.messages.create(
-                model="claude-3-5-sonnet-20241022",
-                max_tokens=1000,
+                model=MODEL,
+                max_tokens=MAX_TOKENS,
                 system=system_prompt,
                 messages=[{"role": "user", "content": user_prompt}],
             )
             content = getattr(response, "content", None) or []
             first = content[0] if content else None
             text = getattr(first, "text", None)
-            return text or _fallback_format(hardware_stores)
+            return text or _fallback_format(stores)
         except Exception as e:
             return f"Error processing query with Anthropic: {e}"
 
@@ -49,20 +66,23 @@ class AnthropicAgent:
             return "Tell me your city/address and what you need, and I’ll list nearby hardware stores."
 
         try:
-            self.conversation_history.append({"role": "user", "content": message})
+            user_turn = {"role": "user", "content": message}
             response = self.client.messages.create(
-                model="claude-3-5-sonnet-20241022",
-                max_tokens=1000,
-                messages=self.conversation_history,
+                model=MODEL,
+                max_tokens=MAX_TOKENS,
+                messages=[*self.conversation_history, user_turn],
             )
             assistant_response = response.content[0].text
-            self.conversation_history.append({"role": "assistant", "content": assistant_response})
+            # Record the pair only on success so the window always starts on a user turn
+            self.conversation_history.extend(
+                (user_turn, {"role": "assistant", "content": assistant_response})
+            )
             return assistant_response
         except Exception as e:
             return f"Error in chat: {e}"
 
     def clear_conversation(self):
-        self.conversation_history = []
+        self.conversation_history.clear()
 
 
 # ---------- Prompt helpers ----------
@@ -86,33 +106,56 @@ def _create_system_prompt() -> str:
     )
 
 
-def _create_user_prompt(location: str, requirements: List[str], hardware_stores: List[Any]) -> str:
-    stores_info = _format_stores_for_prompt(hardware_stores)
-    reqs = ", ".join(requirements) if requirements else "General hardware store visit"
+# Both prompts are mostly constant text; build them once at import
+_SYSTEM_PROMPT = _create_system_prompt()
 
-    return (
-        f"Location: {location}\n"
-        f"Requirements: {reqs}\n\n"
-        "Hardware stores found:\n\n"
-        f"{stores_info}\n\n"
-        "Format the top 5 stores in the requested format with Google Maps links."
+_USER_PROMPT_TMPL = (
+    "Location: %s\n"
+    "Requirements: %s\n\n"
+    "Hardware stores found:\n\n"
+    "%s\n\n"
+    "Format the top 5 stores in the requested format with Google Maps links."
+)
+
+
+def _create_user_prompt(location: str, requirements: List[str], stores: List[_StoreFields]) -> str:
+    stores_info = _format_stores_for_prompt(stores)
+    reqs = ", ".join(requirements) if requirements else "General hardware store visit"
+    return _USER_PROMPT_TMPL % (location, reqs, stores_info)
+
+
+class _StoreFields(NamedTuple):
+    name: Any
+    address: Any
+    distance: Any
+    rating: Any
+    review_count: Any
+    phone: Any
+    maps_url: str
+
+
+def _extract_store_fields(store: Any, get: Optional[Callable[[Any, str], Any]] = None) -> _StoreFields:
+    get = get or _get
+    name = get(store, "name")
+    address = get(store, "address")
+    maps_url = f"https://www.google.com/maps/search/?api=1&query={quote_plus(f'{name} {address}')}"
+    return _StoreFields(
+        name=name,
+        address=address,
+        distance=get(store, "distance"),
+        rating=get(store, "rating"),
+        review_count=get(store, "review_count"),
+        phone=get(store, "phone"),
+        maps_url=maps_url,
     )
 
 
-def _format_stores_for_prompt(hardware_stores: List[Any]) -> str:
-    if not hardware_stores:
+def _format_stores_for_prompt(stores: List[_StoreFields]) -> str:
+    if not stores:
         return "No hardware stores found in the area."
 
     formatted: List[str] = []
-    for i, store in enumerate(hardware_stores[:5], 1):
-        name = _get(store, "name")
-        address = _get(store, "address")
-        distance = _get(store, "distance")
-        rating = _get(store, "rating")
-        review_count = _get(store, "review_count")
-        phone = _get(store, "phone")
-
-        maps_url = f"https://www.google.com/maps/search/?api=1&query={str(name).replace(' ', '+')}+{str(address).replace(' ', '+')}"
+    for i, (name, address, distance, rating, review_count, phone, maps_url) in enumerate(stores, 1):
         parts = [
             f"{i}. {name}",
             f"   Address: {address}",
@@ -127,20 +170,12 @@ def _format_stores_for_prompt(hardware_stores: List[Any]) -> str:
     return "\n\n".join(formatted)
 
 
-def _fallback_format(hardware_stores: List[Any]) -> str:
-    if not hardware_stores:
+def _fallback_format(stores: List[_StoreFields]) -> str:
+    if not stores:
         return "No hardware stores found in the specified area."
 
     out: List[str] = []
-    for i, store in enumerate(hardware_stores[:5], 1):
-        name = _get(store, "name")
-        address = _get(store, "address")
-        distance = _get(store, "distance")
-        rating = _get(store, "rating")
-        review_count = _get(store, "review_count")
-        phone = _get(store, "phone")
-
-        maps_url = f"https://www.google.com/maps/search/?api=1&query={str(name).replace(' ', '+')}+{str(address).replace(' ', '+')}"
+    for i, (name, address, distance, rating, review_count, phone, maps_url) in enumerate(stores, 1):
         block = "\n".join(
             [
                 f"{i}. {name}",
@@ -157,6 +192,19 @@ def _fallback_format(hardware_stores: List[Any]) -> str:
     return "\n\n".join(out)
 
 
+def _dict_get(obj: Any, key: str) -> Any:
+    return obj.get(key)
+
+
+def _attr_get(obj: Any, key: str) -> Any:
+    return getattr(obj, key, None)
+
+
+def _make_getter(sample: Any) -> Callable[[Any, str], Any]:
+    # Stores in one result list share a type, so choose the access mode once
+    return _dict_get if isinstance(sample, dict) else _attr_get
+
+
 def _get(obj: Any, key: str) -> Any:
     if hasattr(obj, key):
         return getattr(obj, key)
@@ -0,0 +1,36 @@
+# chat_compat.py — turn chat_protocol_spec into a Protocol across uagents/uagents_core versions
+
+from __future__ import annotations
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from uagents import Protocol
+
+# Working constructor per spec, found on first use. Each call still builds a
+# fresh Protocol so agents in one process never share chat handlers.
+_BUILDERS: Dict[int, Callable[[], Protocol]] = {}
+
+
+def _candidate_builders(spec: Any) -> Iterator[Callable[[], Protocol]]:
+    # Try common constructors across uagents/uagents_core versions
+    for attr in ("to_protocol", "as_protocol", "build", "create_protocol"):
+        fn = getattr(spec, attr, None)
+        if callable(fn):
+            yield fn
+    yield lambda: Protocol(spec=spec)
+    # Some versions provide this helper instead
+    yield lambda: Protocol.from_spec(spec)
+
+
+def chat_protocol_from_spec(spec: Any) -> Optional[Protocol]:
+    builder = _BUILDERS.get(id(spec))
+    if builder is not None:
+        return builder()
+
+    for builder in _candidate_builders(spec):
+        try:
+            proto = builder()
+        except Exception:
+            continue
+        _BUILDERS[id(spec)] = builder
+        return proto
+    return None
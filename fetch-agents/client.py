@@ -2,7 +2,10 @@
 
 from __future__ import annotations
 import os
-from typing import List
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import List, Optional, Tuple
 from datetime import datetime
 from uuid import uuid4
 from urllib.parse import quote
@@ -39,18 +42,13 @@ from main import (
     parse_query,    # your robust parser
 )
 
-# ---- helper to build the chat protocol from spec (handles version diffs) ----
-def _chat_to_protocol(spec) -> Protocol:
-    for attr in ("to_protocol", "as_protocol", "build", "create_protocol"):
-        fn = getattr(spec, attr, None)
-        if callable(fn):
-            try:
-                return fn()
-            except Exception:
-                pass
-    return Protocol(spec=spec)  # final fallback
+# ---- chat protocol from spec (handles version diffs) ----
+from chat_compat import chat_protocol_from_spec
 
-chat_proto = _chat_to_protocol(chat_protocol_spec)
+chat_proto = chat_protocol_from_spec(chat_protocol_spec)
+if chat_proto is None:
+    # The handlers below are registered on it, so there is no fallback here
+    raise RuntimeError("chat_protocol_spec could not be converted to a Protocol")
 
 store_proto = Protocol(name="store_finder_protocol", version="1.0")
 
@@ -96,6 +94,37 @@ except Exception as e:
     traceback.print_exc()
     _core = None
 
+# ---- repeat-query caches ----
+SEARCH_CACHE_TTL = 60.0     # seconds a store search result is reused
+SEARCH_CACHE_MAX = 256      # entries kept before evicting the oldest
+
+# (location, requirements) -> (stored_at, response), least recently used first
+_search_cache: OrderedDict = OrderedDict()
+
+@lru_cache(maxsize=512)
+def _cached_parse(user_msg: str) -> Tuple[Optional[str], Tuple[str, ...]]:
+    # parse_query is pure; tuples keep the cached value immutable
+    location, requirements = parse_query(user_msg)
+    return location, tuple(requirements or ())
+
+async def _cached_search(location: str, requirements: Tuple[str, ...]) -> StoreSearchResponse:
+    """Reuse a recent successful search for the same location + requirements."""
+    # Case and requirement order don't change the search
+    key = (location.lower(), tuple(sorted(requirements)))
+    hit = _search_cache.get(key)
+    if hit is not None and time.monotonic() - hit[0] < SEARCH_CACHE_TTL:
+        _search_cache.move_to_end(key)
+        return hit[1]
+
+    req = StoreSearchRequest(location=location, requirements=list(requirements) or None)
+    resp: StoreSearchResponse = await _core.search(req)
+    if resp.success:
+        _search_cache[key] = (time.monotonic(), resp)
+        _search_cache.move_to_end(key)
+        if len(_search_cache) > SEARCH_CACHE_MAX:
+            _search_cache.popitem(last=False)
+    return resp
+
 # ---------------- Chat Handlers ----------------
 @chat_proto.on_message(ChatMessage)
 async def on_chat(ctx: Context, sender: str, msg: ChatMessage):
@@ -111,6 +140,9 @@ async def on_chat(ctx: Context, sender: str, msg: ChatMessage):
         ctx.logger.debug("[CHAT] ignoring self-echo")
         return
 
+    # One timestamp per incoming message, shared by the ACK and every reply
+    now = datetime.now()
+
     # Extract and log the actual message content
     texts: List[str] = [
         c.text.strip()
@@ -133,7 +165,7 @@ async def on_chat(ctx: Context, sender: str, msg: ChatMessage):
         await ctx.send(
             sender,
             ChatAcknowledgement(
-                timestamp=datetime.now(),
+                timestamp=now,
                 acknowledged_msg_id=getattr(msg, "msg_id", None),
             ),
         )
@@ -149,7 +181,7 @@ async def on_chat(ctx: Context, sender: str, msg: ChatMessage):
         await ctx.send(
             sender,
             ChatMessage(
-                timestamp=datetime.now(),
+                timestamp=now,
                 msg_id=uuid4(),
                 content=[TextContent(type="text", text=greet)],
             ),
@@ -162,7 +194,7 @@ async def on_chat(ctx: Context, sender: str, msg: ChatMessage):
         await ctx.send(
             sender,
             ChatMessage(
-                timestamp=datetime.now(),
+                timestamp=now,
                 msg_id=uuid4(),
                 content=[TextContent(type="text", text=hint)],
             ),
@@ -178,7 +210,7 @@ async def on_chat(ctx: Context, sender: str, msg: ChatMessage):
         if _core is None:
             raise Exception("StoreFinderCore is not initialized. Check API keys in .env file.")
         
-        location, requirements = parse_query(user_msg)
+        location, requirements = _cached_parse(user_msg)
         if not location:
             reply = "Add a location, e.g., 'near Austin, TX'."
             ctx.logger.warning("[CHAT] no location found in query")
@@ -186,8 +218,7 @@ async def on_chat(ctx: Context, sender: str, msg: ChatMessage):
         else:
             ctx.logger.info(f"[CHAT] searching for stores near {location}")
             print(f"[CHAT] 🔎 Searching for stores near {location}")
-            req = StoreSearchRequest(location=location, requirements=requirements or None)
-            resp: StoreSearchResponse = _core.search(req)
+            resp = await _cached_search(location, requirements)
             reply = _format_stores_for_chat(location, resp)
             ctx.logger.info(f"[CHAT] found {resp.stores_found} stores")
             print(f"[CHAT] ✅ Found {resp.stores_found} stores")
@@ -200,7 +231,7 @@ async def on_chat(ctx: Context, sender: str, msg: ChatMessage):
     await ctx.send(
         sender,
         ChatMessage(
-            timestamp=datetime.now(),
+            timestamp=now,
             msg_id=uuid4(),
             content=[TextContent(type="text", text=reply)],
         ),
@@ -253,6 +284,11 @@ async def _startup(ctx: Context):
     print("👂 Listening for chat messages from agentverse...")
     print("=" * 80)
 
+@agent.on_event("shutdown")
+async def _shutdown(ctx: Context):
+    if _core is not None:
+        await _core.close()
+
 if __name__ == "__main__":
     print("\n" + "=" * 80)
     print("🏪 Store Finder Client")
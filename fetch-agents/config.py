@@ -3,29 +3,44 @@ Configuration module for the Store Finder Agent.
 """
 
 import os
+from dataclasses import dataclass
+from functools import lru_cache
 from typing import Optional
 from dotenv import load_dotenv
 
 
+@dataclass(frozen=True, slots=True)
 class Config:
-    """Configuration class for managing environment variables and settings."""
+    """Configuration loaded once from environment variables; read attributes directly."""
     
-    def __init__(self):
+    # API Keys
+    anthropic_api_key: Optional[str]
+    yelp_api_key: Optional[str]
+    
+    # Default settings
+    default_radius: int  # meters
+    default_limit: int
+    default_sort_by: str
+    
+    # Anthropic settings
+    anthropic_model: str
+    max_tokens: int
+    
+    @classmethod
+    def from_env(cls) -> "Config":
         """Load configuration from environment variables."""
         load_dotenv()
+        env = os.environ
         
-        # API Keys
-        self.anthropic_api_key = os.getenv("ANTHROPIC_API_KEY")
-        self.yelp_api_key = os.getenv("YELP_API_KEY")
-        
-        # Default settings
-        self.default_radius = int(os.getenv("DEFAULT_RADIUS", "10000"))  # meters
-        self.default_limit = int(os.getenv("DEFAULT_LIMIT", "20"))
-        self.default_sort_by = os.getenv("DEFAULT_SORT_BY", "distance")
-        
-        # Anthropic settings
-        self.anthropic_model = os.getenv("ANTHROPIC_MODEL", "claude-3-sonnet-20240229")
-        self.max_tokens = int(os.getenv("MAX_TOKENS", "1000"))
+        return cls(
+            anthropic_api_key=env.get("ANTHROPIC_API_KEY"),
+            yelp_api_key=env.get("YELP_API_KEY"),
+            default_radius=int(env.get("DEFAULT_RADIUS", "10000")),
+            default_limit=int(env.get("DEFAULT_LIMIT", "20")),
+            default_sort_by=env.get("DEFAULT_SORT_BY", "distance"),
+            anthropic_model=env.get("ANTHROPIC_MODEL", "claude-3-sonnet-20240229"),
+            max_tokens=int(env.get("MAX_TOKENS", "1000")),
+        )
     
     def validate(self) -> bool:
         """Validate that required configuration is present."""
@@ -38,32 +53,9 @@ class Config:
             return False
         
         return True
-    
-    def get_yelp_api_key(self) -> Optional[str]:
-        """Get Yelp API key."""
-        return self.yelp_api_key
-    
-    def get_anthropic_api_key(self) -> Optional[str]:
-        """Get Anthropic API key."""
-        return self.anthropic_api_key
-    
-    def get_default_radius(self) -> int:
-        """Get default search radius."""
-        return self.default_radius
-    
-    def get_default_limit(self) -> int:
-        """Get default result limit."""
-        return self.default_limit
-    
-    def get_default_sort_by(self) -> str:
-        """Get default sort method."""
-        return self.default_sort_by
-    
-    def get_anthropic_model(self) -> str:
-        """Get Anthropic model name."""
-        return self.anthropic_model
-    
-    def get_max_tokens(self) -> int:
-        """Get maximum tokens for Anthropic responses."""
-        return self.max_tokens
 
+
+@lru_cache(maxsize=1)
+def get_config() -> Config:
+    """Process-wide configuration; .env is read on the first call only."""
+    return Config.from_env()
@@ -1,9 +1,9 @@
 from __future__ import annotations
-from typing import List, Optional
 import os
 
-from uagents import Agent, Context, Protocol, Model, Bureau
+from uagents import Agent, Context, Protocol
 from hs_model import llm_generate_steps
+from shared_models import GenerateRequest, GenerateResponse, ErrorResponse
 
 # Chat protocol components (spec + types)
 from uagents_core.contrib.protocols.chat import (
@@ -14,24 +14,7 @@ from uagents_core.contrib.protocols.chat import (
     EndSessionContent,
     StartSessionContent,
 )
-
-# ----- Models -----
-class GenerateRequest(Model):
-    prompt: str
-    transcript: Optional[str] = None
-    style: Optional[str] = "concise"
-    max_steps: Optional[int] = None
-
-class GenerateResponse(Model):
-    title: str
-    steps: List[str]
-    assumptions: Optional[List[str]] = None
-    tips: Optional[List[str]] = None
-    tools: Optional[List[str]] = None
-    products: Optional[List[str]] = None
-
-class ErrorResponse(Model):
-    message: str
+from chat_compat import chat_protocol_from_spec
 
 # ----- Tutorial Protocol -----
 tutorial_proto = Protocol(name="house_tutorial_protocol", version="1.0")
@@ -40,7 +23,7 @@ tutorial_proto = Protocol(name="house_tutorial_protocol", version="1.0")
 async def handle_tutorial(ctx: Context, sender: str, msg: GenerateRequest):
     ctx.logger.info(f"📥 RECEIVED from {sender} | prompt='{(msg.prompt or '')[:80]}'")
     try:
-        data = llm_generate_steps(
+        data = await llm_generate_steps(
             msg.prompt, msg.transcript, msg.style or "concise", msg.max_steps
         )
         await ctx.send(sender, GenerateResponse(
@@ -62,40 +45,17 @@ agent = Agent(name="HouseGuide", seed="HouseGuide-seed", mailbox=True)
 # Include our tutorial protocol (publish so others can discover it)
 agent.include(tutorial_proto, publish_manifest=True)
 
-# === 🔧 Convert chat_protocol_spec → Protocol for older/newer versions ===
-def _chat_as_protocol(spec):
-    # Try common constructors across uagents/uagents_core versions
-    for attr in ("to_protocol", "as_protocol", "build", "create_protocol"):
-        fn = getattr(spec, attr, None)
-        if callable(fn):
-            try:
-                return fn()
-            except Exception:
-                pass
-    # Try the uAgents helper if available
-    try:
-        return Protocol.from_spec(spec)  # some versions provide this
-    except Exception:
-        return None
-
-_chat_proto = _chat_as_protocol(chat_protocol_spec)
-if _chat_proto is not None:
-    agent.include(_chat_proto, publish_manifest=True)
-else:
-    # Fallback: don't publish the chat spec (handlers still work, but Inspector chat may be disabled)
-    print("⚠️ Could not convert chat_protocol_spec to Protocol. Chat manifest not published.")
-
 # ----- Minimal Chat Handlers -----
-@agent.on_message(model=ChatMessage, replies={ChatAcknowledgement, ChatMessage})
 async def handle_chat(ctx: Context, sender: str, msg: ChatMessage):
     await ctx.send(sender, ChatAcknowledgement(acknowledged_msg_id=getattr(msg, "msg_id", None)))
 
-    texts = []
-    for part in msg.content:
-        if isinstance(part, TextContent) and (part.text or "").strip():
-            texts.append(part.text.strip())
+    # Only whether any text was sent matters; stop at the first one
+    has_text = any(
+        isinstance(part, TextContent) and (part.text or "").strip()
+        for part in (msg.content or ())
+    )
 
-    if texts:
+    if has_text:
         reply = ("Hi! I’m your House-Services guide. Tell me what you’re fixing and I’ll "
                  "generate a step-by-step plan plus a tools/products list.")
     else:
@@ -103,6 +63,22 @@ async def handle_chat(ctx: Context, sender: str, msg: ChatMessage):
 
     await ctx.send(sender, ChatMessage(content=[TextContent(type="text", text=reply)]))
 
+async def handle_chat_ack(ctx: Context, sender: str, msg: ChatAcknowledgement):
+    pass
+
+# === 🔧 Convert chat_protocol_spec → Protocol for older/newer versions ===
+_chat_proto = chat_protocol_from_spec(chat_protocol_spec)
+if _chat_proto is not None:
+    # A spec protocol only passes verification once every message it
+    # defines has a handler, so register them before including it
+    _chat_proto.on_message(ChatMessage)(handle_chat)
+    _chat_proto.on_message(ChatAcknowledgement)(handle_chat_ack)
+    agent.include(_chat_proto, publish_manifest=True)
+else:
+    # Fallback: don't publish the chat spec (handlers still work, but Inspector chat may be disabled)
+    print("⚠️ Could not convert chat_protocol_spec to Protocol. Chat manifest not published.")
+    agent.on_message(model=ChatMessage, replies={ChatAcknowledgement, ChatMessage})(handle_chat)
+
 # ----- Public runner (Agentverse / Inspector) -----
 if __name__ == "__main__":
     agent.run()
@@ -3,13 +3,13 @@ from __future__ import annotations
 import os
 from typing import Optional, List, Tuple
 from urllib.parse import quote
-from datetime import datetime
+from datetime import datetime, timezone
 from uuid import uuid4
 
 from dotenv import load_dotenv
 load_dotenv()
 
-from uagents import Agent, Context, Protocol, Model
+from uagents import Agent, Context, Protocol
 
 # --- Chat protocol types & spec (we'll include spec via Protocol(spec=...)) ---
 from uagents_core.contrib.protocols.chat import (
@@ -21,23 +21,11 @@ from uagents_core.contrib.protocols.chat import (
     chat_protocol_spec,
 )
 
-# --- Tutorial models (must match hs_agent) ---
-class GenerateRequest(Model):
-    prompt: str
-    transcript: Optional[str] = None
-    style: Optional[str] = "concise"
-    max_steps: Optional[int] = None
+# --- Tutorial models (shared with hs_agent / tutorial_agent) ---
+from shared_models import GenerateRequest, GenerateResponse, ErrorResponse, clip_prompt, clip_transcript
+from shared_formatting import format_tutorial_markdown
 
-class GenerateResponse(Model):
-    title: str
-    steps: List[str]
-    assumptions: Optional[List[str]] = None
-    tips: Optional[List[str]] = None
-    tools: Optional[List[str]] = None
-    products: Optional[List[str]] = None
-
-class ErrorResponse(Model):
-    message: str
+_UTC = timezone.utc
 
 # --- Tutorial protocol (name/version must match backend agent) ---
 tutorial_proto = Protocol(name="house_tutorial_protocol", version="1.0")
@@ -59,51 +47,42 @@ def _extract_prompt_transcript(msg: ChatMessage) -> Tuple[Optional[str], Optiona
     If the user sends one text, treat it as 'prompt'.
     If they send two texts in the same ChatMessage, treat the second as 'transcript'.
     """
-    texts = [c.text.strip() for c in msg.content if isinstance(c, TextContent) and (c.text or "").strip()]
-    prompt = texts[0] if texts else None
-    transcript = texts[1] if len(texts) > 1 else None
+    # One pass, each text stripped once, stopping as soon as both are found;
+    # oversized input is cut here so it never reaches the backend agent
+    texts: List[str] = []
+    for c in msg.content or ():
+        if isinstance(c, TextContent):
+            text = (c.text or "").strip()
+            if text:
+                texts.append(text)
+                if len(texts) == 2:
+                    break
+    prompt = clip_prompt(texts[0]) if texts else None
+    transcript = clip_transcript(texts[1]) if len(texts) > 1 else None
     return prompt, transcript
 
-def _format_tutorial(resp: GenerateResponse) -> str:
-    lines: List[str] = [f"# {resp.title}", ""]
-    if resp.tools or resp.products:
-        lines.append("## Tools & Products")
-        for x in resp.tools or []:
-            lines.append(f"- {x}")
-        for x in resp.products or []:
-            lines.append(f"- {x}")
-        lines.append("")
-    lines.append("## Steps")
-    for i, step in enumerate(resp.steps, 1):
-        lines.append(f"{i}. {step}")
-    if resp.assumptions:
-        lines.append("\n## Assumptions")
-        for a in resp.assumptions:
-            lines.append(f"- {a}")
-    if resp.tips:
-        lines.append("\n## Tips")
-        for t in resp.tips:
-            lines.append(f"- {t}")
-    return "\n".join(lines)
-
 def _chunk_text(s: str, limit: int = 1800) -> List[str]:
     parts: List[str] = []
     buf = ""
     for para in s.split("\n\n"):
-        candidate = (f"{buf}\n\n{para}".strip()) if buf else para
-        if len(candidate) <= limit:
-            buf = candidate
+        if buf:
+            # Decide from lengths first so rejected joins are never built; strip()
+            # can only shorten the joined text when whitespace sits at its edges
+            fits = len(buf) + 2 + len(para) <= limit
+            if not fits and (buf[0].isspace() or not para or para[-1].isspace()):
+                fits = len(f"{buf}\n\n{para}".strip()) <= limit
+            if fits:
+                buf = f"{buf}\n\n{para}".strip()
+                continue
+            parts.append(buf)
+        if len(para) <= limit:
+            buf = para
         else:
-            if buf:
-                parts.append(buf)
-            if len(para) <= limit:
-                buf = para
-            else:
-                p = para
-                while len(p) > limit:
-                    parts.append(p[:limit])
-                    p = p[limit:]
-                buf = p
+            p = para
+            while len(p) > limit:
+                parts.append(p[:limit])
+                p = p[limit:]
+            buf = p
     if buf:
         parts.append(buf)
     return parts
@@ -116,12 +95,9 @@ async def handle_message(ctx: Context, sender: str, msg: ChatMessage):
     await ctx.send(sender, ChatAcknowledgement(acknowledged_msg_id=getattr(msg, "msg_id", None)))
 
     # Extract prompt/transcript (1st text = prompt, 2nd = transcript)
-    texts = [c.text.strip() for c in (msg.content or [])
-             if isinstance(c, TextContent) and (c.text or "").strip()]
-    if not texts:
+    prompt, transcript = _extract_prompt_transcript(msg)
+    if not prompt:
         return
-    prompt = texts[0]
-    transcript = texts[1] if len(texts) > 1 else None
 
     # Forward to your backend agent
     to_addr = os.getenv("HOUSE_GUIDE_ADDRESS")
@@ -144,27 +120,13 @@ async def handle_ack(ctx: Context, sender: str, msg: ChatAcknowledgement):
 @tutorial_proto.on_message(model=GenerateResponse)
 async def handle_tutorial_ok(ctx: Context, sender: str, msg: GenerateResponse):
     peer = ctx.storage.get("reply_peer") or sender
-    lines = [f"**{msg.title}**", ""]
-    if msg.tools or msg.products:
-        lines.append("**Tools & Products**")
-        n = 1
-        for x in msg.tools or []: lines.append(f"{n}. {x}"); n += 1
-        for x in msg.products or []: lines.append(f"{n}. {x}"); n += 1
-        lines.append("")
-    lines.append("**Steps**")
-    for i, step in enumerate(msg.steps, 1): lines.append(f"{i}. {step}")
-    if msg.assumptions:
-        lines.append(""); lines.append("**Assumptions**")
-        for i, a in enumerate(msg.assumptions, 1): lines.append(f"{i}. {a}")
-    if msg.tips:
-        lines.append(""); lines.append("**Tips**")
-        for i, t in enumerate(msg.tips, 1): lines.append(f"{i}. {t}")
-    await ctx.send(peer, ChatMessage(content=[TextContent(type="text", text="\n".join(lines))]))
+    text = format_tutorial_markdown(msg)
+    await ctx.send(peer, ChatMessage(content=[TextContent(type="text", text=text)]))
 
 @tutorial_proto.on_message(model=ErrorResponse)
 async def handle_tutorial_err(ctx: Context, sender: str, msg: ErrorResponse):
     peer = ctx.storage.get("reply_peer") or sender
-    await ctx.send(peer, ChatMessage(timestamp=datetime.now(), msg_id=uuid4(),
+    await ctx.send(peer, ChatMessage(timestamp=datetime.now(_UTC), msg_id=uuid4(),
                                      content=[TextContent(type="text", text=f"Error: {msg.message}")]))
 
 # ---------- Include protocols & run ----------
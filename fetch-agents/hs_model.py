@@ -1,7 +1,10 @@
 # hs_model.py
 from __future__ import annotations
-import os, json
-from typing import Dict, Any, List, Optional
+import os, json, re, time, copy, hashlib, asyncio
+from collections import OrderedDict
+
+from shared_models import clip_prompt, clip_transcript
+from typing import Dict, Any, List, Optional, Union
 
 # Load .env if present
 try:
@@ -11,7 +14,122 @@ except Exception:
     pass
 
 ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
-ANTHROPIC_MODEL = os.getenv("ANTHROPIC_MODEL", "claude-3-5-sonnet-latest")
+# Short templated JSON suits the fast model; the stronger one is only used when
+# the fast model's answer is unusable
+ANTHROPIC_MODEL = os.getenv("ANTHROPIC_MODEL", "claude-3-5-haiku-latest")
+ANTHROPIC_FALLBACK_MODEL = os.getenv("ANTHROPIC_FALLBACK_MODEL", "claude-3-5-sonnet-latest")
+
+# Prompt caching beta; harmless once the feature is generally available
+PROMPT_CACHING_HEADERS = {"anthropic-beta": "prompt-caching-2024-07-31"}
+
+# Optional: orjson serializes the prompt schema/payload faster than the stdlib
+try:
+    import orjson
+except Exception:  # pragma: no cover
+    orjson = None  # type: ignore
+
+# Optional: Anthropic SDK (pip install anthropic)
+try:
+    import httpx
+    from anthropic import AsyncAnthropic, DefaultAsyncHttpxClient
+except Exception:  # pragma: no cover
+    AsyncAnthropic = None  # type: ignore
+
+def _build_client():
+    if AsyncAnthropic is None or not ANTHROPIC_API_KEY:
+        return None
+    # One pooled client per process: keep-alive connections skip the TCP/TLS
+    # handshake that a fresh client paid on every call
+    return AsyncAnthropic(
+        api_key=ANTHROPIC_API_KEY,
+        default_headers=PROMPT_CACHING_HEADERS,
+        max_retries=2,
+        timeout=60.0,
+        http_client=DefaultAsyncHttpxClient(
+            limits=httpx.Limits(max_keepalive_connections=20, max_connections=100)
+        ),
+    )
+
+_ANTHROPIC = _build_client()
+
+# Static instructions, byte-identical across calls so Anthropic can serve them
+# from its prompt cache; per-request context goes in a separate block after it
+_SYSTEM_INSTRUCTIONS = (
+    "You are a House-Services Guide for home maintenance and repair. "
+    "Goals: (1) safety first, (2) household best practices, (3) renter-friendly options, "
+    "(4) clear, testable steps.\n\n"
+    "INPUTS:\n"
+    "- User goal.\n"
+    "- Optional transcript with extra context.\n\n"
+    "OUTPUT (JSON only): {title, steps[], assumptions[], tips[], tools[], products[]}\n"
+    "STYLE & PRIORITIES:\n"
+    "• Safety first (PPE, shutoffs, hazards). Include a verification step.\n"
+    "• Renter-friendly, non-destructive where possible.\n"
+    "• Steps: short, imperative, verifiable. Keep at most 'max_steps'.\n"
+    "• Tools/products: the minimal realistic list for a beginner.\n"
+    "• Tips: common pitfalls; 1–3 escalation cases when to call a professional.\n\n"
+)
+
+# ----- Local response cache: repeated questions skip the LLM round-trip -----
+RESPONSE_CACHE_TTL = float(os.getenv("HS_CACHE_TTL", "3600"))  # seconds
+RESPONSE_CACHE_MAX = 1024
+
+_response_cache: OrderedDict = OrderedDict()  # key -> (stored_at, data)
+_WS_RE = re.compile(r"\s+")
+
+# Response-cache key -> future of the LLM call currently answering it
+_in_flight: Dict[tuple, "asyncio.Future[Dict[str, Any]]"] = {}
+
+def _response_key(prompt: str, transcript: Optional[str], style: str, max_steps: Optional[int]) -> tuple:
+    norm_prompt = _WS_RE.sub(" ", (prompt or "").strip().lower())
+    transcript_hash = hashlib.blake2b((transcript or "").strip().encode(), digest_size=16).hexdigest()
+    return (norm_prompt, transcript_hash, style, max_steps)
+
+def _cache_get(key: tuple) -> Optional[Dict[str, Any]]:
+    hit = _response_cache.get(key)
+    if hit is None or time.monotonic() - hit[0] >= RESPONSE_CACHE_TTL:
+        return None
+    _response_cache.move_to_end(key)
+    return copy.deepcopy(hit[1])
+
+def _cache_put(key: tuple, data: Dict[str, Any]) -> None:
+    _response_cache[key] = (time.monotonic(), copy.deepcopy(data))
+    _response_cache.move_to_end(key)
+    if len(_response_cache) > RESPONSE_CACHE_MAX:
+        _response_cache.popitem(last=False)
+
+def _dumps(obj: Any) -> str:
+    # Sorted and compact either way, so the prompt text is byte-stable across
+    # calls and identical whether or not orjson is installed
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS).decode()
+    return json.dumps(obj, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+_DECODER = json.JSONDecoder()
+
+def _decode_from_first_brace(text: str) -> Optional[Dict[str, Any]]:
+    """The object starting at the first '{', or None while it is still incomplete."""
+    i = text.find("{")
+    if i == -1:
+        return None
+    try:
+        return _DECODER.raw_decode(text, i)[0]
+    except ValueError:
+        return None
+
+def _extract_json_object(text: str) -> Dict[str, Any]:
+    """First JSON object in the reply, decoded in place from its opening brace.
+
+    A stray '{' in prose before the real object is skipped by retrying from
+    the next brace, and trailing text or markdown fences are ignored."""
+    i = text.find("{")
+    while i != -1:
+        try:
+            obj, _ = _DECODER.raw_decode(text, i)
+            return obj
+        except ValueError:
+            i = text.find("{", i + 1)
+    return {}
 
 def _fallback(prompt: str, transcript: Optional[str], max_steps: int) -> Dict[str, Any]:
     base_steps = [
@@ -42,74 +160,125 @@ def _fallback(prompt: str, transcript: Optional[str], max_steps: int) -> Dict[st
         "products": products,
     }
 
-def _anthropic_json(system_prompt: str, user_prompt: str) -> Dict[str, Any]:
-    if not ANTHROPIC_API_KEY:
+# The schema never changes, so it is serialized once
+_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "title": {"type": "string"},
+        "steps": {"type": "array", "items": {"type": "string"}},
+        "assumptions": {"type": "array", "items": {"type": "string"}},
+        "tips": {"type": "array", "items": {"type": "string"}},
+        "tools": {"type": "array", "items": {"type": "string"}},
+        "products": {"type": "array", "items": {"type": "string"}},
+    },
+    "required": ["title", "steps"],
+}
+_SCHEMA_JSON = _dumps(_SCHEMA)
+
+# House-Services Guide — safety-forward, renter-friendly, with tools/products.
+# Entirely static, so every call hits the same prompt-cache prefix; the
+# transcript travels in the user message instead
+_SYSTEM_PROMPT = [
+    {
+        "type": "text",
+        "text": _SYSTEM_INSTRUCTIONS + "Return valid JSON only, with no extra commentary.",
+        "cache_control": {"type": "ephemeral"},
+    },
+]
+
+_USER_PROMPT_TMPL = (
+    "CONTEXT (use verbatim when helpful):\n"
+    "%s\n\n"
+    "Schema:\n" + _SCHEMA_JSON.replace("%", "%%") + "\n\n"
+    "Payload:\n"
+    "%s\n\n"
+    "Write JSON matching the schema. Keep steps <= max_steps."
+)
+
+async def _anthropic_json(
+    system_prompt: Union[str, List[Dict[str, Any]]],
+    user_prompt: str,
+    model: str = ANTHROPIC_MODEL,
+) -> Dict[str, Any]:
+    if _ANTHROPIC is None:
         return {}
     try:
-        from anthropic import Anthropic  # pip install anthropic
-        client = Anthropic(api_key=ANTHROPIC_API_KEY)
-        msg = client.messages.create(
-            model=ANTHROPIC_MODEL,
+        parts: List[str] = []
+        async with _ANTHROPIC.messages.stream(
+            model=model,
             max_tokens=1100,
             temperature=0.2,
             system=system_prompt,
             messages=[{"role": "user", "content": user_prompt}],
-        )
-        text = "".join(getattr(p, "text", "") for p in msg.content)
-        i, j = text.find("{"), text.rfind("}")
-        if i == -1 or j == -1 or j < i:
-            return {}
-        return json.loads(text[i:j+1])
+        ) as stream:
+            async for chunk in stream.text_stream:
+                parts.append(chunk)
+                # The object can only be complete once a closing brace arrives;
+                # as soon as it parses, stop instead of waiting for any trailing
+                # commentary (leaving the block closes the stream)
+                if "}" in chunk:
+                    data = _decode_from_first_brace("".join(parts))
+                    if data is not None:
+                        return data
+        return _extract_json_object("".join(parts))
     except Exception:
         return {}
 
-def llm_generate_steps(
+def _usable(data: Any) -> bool:
+    return bool(data) and isinstance(data, dict) and bool(data.get("steps"))
+
+async def llm_generate_steps(
     prompt: str,
     transcript: Optional[str] = None,
     style: str = "concise",
     max_steps: Optional[int] = None,
 ) -> Dict[str, Any]:
-    # House-Services Guide — safety-forward, renter-friendly, with tools/products
-    system_prompt = (
-        "You are a House-Services Guide for home maintenance and repair. "
-        "Goals: (1) safety first, (2) household best practices, (3) renter-friendly options, "
-        "(4) clear, testable steps.\n\n"
-        "INPUTS:\n"
-        "- User goal.\n"
-        "- Optional transcript with extra context.\n\n"
-        "OUTPUT (JSON only): {title, steps[], assumptions[], tips[], tools[], products[]}\n"
-        "STYLE & PRIORITIES:\n"
-        "• Safety first (PPE, shutoffs, hazards). Include a verification step.\n"
-        "• Renter-friendly, non-destructive where possible.\n"
-        "• Steps: short, imperative, verifiable. Keep at most 'max_steps'.\n"
-        "• Tools/products: the minimal realistic list for a beginner.\n"
-        "• Tips: common pitfalls; 1–3 escalation cases when to call a professional.\n\n"
-        "CONTEXT (use verbatim when helpful):\n"
-        f"{(transcript or '').strip()}\n\n"
-        "Return valid JSON only, with no extra commentary."
-    )
+    # Bound the request size (latency, cost) before anything else sees it
+    prompt = clip_prompt(prompt)
+    transcript = clip_transcript(transcript)
 
-    schema = {
-        "type": "object",
-        "properties": {
-            "title": {"type": "string"},
-            "steps": {"type": "array", "items": {"type": "string"}},
-            "assumptions": {"type": "array", "items": {"type": "string"}},
-            "tips": {"type": "array", "items": {"type": "string"}},
-            "tools": {"type": "array", "items": {"type": "string"}},
-            "products": {"type": "array", "items": {"type": "string"}},
-        },
-        "required": ["title", "steps"],
-    }
+    key = _response_key(prompt, transcript, style, max_steps)
+    cached = _cache_get(key)
+    if cached is not None:
+        return cached
+
+    # Identical requests arriving while one is already with Claude share its answer
+    pending = _in_flight.get(key)
+    if pending is not None:
+        # Shielded so one waiter going away doesn't cancel the shared call
+        return copy.deepcopy(await asyncio.shield(pending))
+
+    fut = asyncio.get_running_loop().create_future()
+    _in_flight[key] = fut
+    try:
+        data = await _generate_steps(key, prompt, transcript, style, max_steps)
+        # Waiters get their own copy; the caller is free to mutate `data`
+        fut.set_result(copy.deepcopy(data))
+        return data
+    except asyncio.CancelledError:
+        fut.cancel()
+        raise
+    except Exception as e:
+        fut.set_exception(e)
+        fut.exception()  # Mark retrieved; waiters still receive it
+        raise
+    finally:
+        del _in_flight[key]
+
+async def _generate_steps(
+    key: tuple,
+    prompt: str,
+    transcript: str,
+    style: str,
+    max_steps: Optional[int],
+) -> Dict[str, Any]:
     payload = {"goal": prompt, "style": style, "max_steps": max_steps}
-    user_prompt = (
-        "Schema:\n" + json.dumps(schema) + "\n\n"
-        "Payload:\n" + json.dumps(payload) + "\n\n"
-        "Write JSON matching the schema. Keep steps <= max_steps."
-    )
+    user_prompt = _USER_PROMPT_TMPL % ((transcript or "").strip(), _dumps(payload))
 
-    data = _anthropic_json(system_prompt, user_prompt)
-    if not data or not isinstance(data, dict) or not data.get("steps"):
+    data = await _anthropic_json(_SYSTEM_PROMPT, user_prompt)
+    if not _usable(data) and ANTHROPIC_FALLBACK_MODEL and ANTHROPIC_FALLBACK_MODEL != ANTHROPIC_MODEL:
+        data = await _anthropic_json(_SYSTEM_PROMPT, user_prompt, ANTHROPIC_FALLBACK_MODEL)
+    if not _usable(data):
         return _fallback(prompt, transcript, max_steps)
 
     # Coerce & cap
@@ -121,12 +290,14 @@ def llm_generate_steps(
     for k in ("assumptions", "tips", "tools", "products"): 
         if data.get(k):
             data[k] = [str(x).strip() for x in data[k]]
+    # Only real LLM answers are cached; the fallback is cheap to rebuild
+    _cache_put(key, data)
     return data
 
 if __name__ == "__main__":
     # quick manual test
     p = os.getenv("HS_TEST_PROMPT", "Fix a leaking kitchen faucet.")
     t = os.getenv("HS_TEST_TRANSCRIPT", "Single-handle faucet drips from spout; shutoff valves present.")
-    out = llm_generate_steps(p, t, "concise", 6)
+    out = asyncio.run(llm_generate_steps(p, t, "concise", 6))
     print(json.dumps(out, indent=2))
 
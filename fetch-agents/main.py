@@ -4,10 +4,10 @@ Store Finder uAgent - Backend Worker (no chat)
 """
 
 from __future__ import annotations
-import os, re
+import asyncio, os, re
 from typing import Optional, List, Tuple
-from datetime import datetime
-from urllib.parse import quote
+from datetime import datetime, timezone
+from urllib.parse import quote, quote_plus
 
 # env + macOS SSL
 try:
@@ -24,9 +24,9 @@ except Exception:
 from uagents import Agent, Context, Protocol, Model
 from uagents.setup import fund_agent_if_low
 
-from yelp_client import YelpAPI, HardwareStore
+from yelp_client import AsyncYelpAPI, HardwareStore
 from anthropic_agent import AnthropicAgent
-from config import Config
+from config import get_config
 
 # ---------------- Models ----------------
 class StoreSearchRequest(Model):
@@ -43,41 +43,53 @@ class StoreSearchResponse(Model):
     error_message: Optional[str] = None
     timestamp: str
 
+# Compiled once at import; parse_query runs on every chat message
+_LOCATION_RE = re.compile(r"(?:near|in|around|at)\s+(.+?)\s*(?:\n| for |:|$)", re.IGNORECASE)
+_REQUIREMENT_KEYWORDS = ("tools", "screws", "nails", "paint", "lumber", "electrical", "plumbing",
+                         "hardware", "supplies", "equipment", "drill", "drill bits")
+# Longest first so "drill bits" wins over "drill"; substring matching like the old `in` checks
+_REQUIREMENT_RE = re.compile("|".join(re.escape(k) for k in sorted(_REQUIREMENT_KEYWORDS, key=len, reverse=True)))
+
 # (requested) robust parser — import/use from client if needed
 def parse_query(user_input: str) -> Tuple[str, List[str]]:
     """
     Extract 'near/in/at/around <location>' safely. Stops at newline / ' for ' / ':'.
     Returns (location, requirement_keywords_found).
     """
-    m = re.search(r"(?:near|in|around|at)\s+(.+?)\s*(?:\n| for |:|$)", user_input, re.IGNORECASE)
+    m = _LOCATION_RE.search(user_input)
     location = (m.group(1).strip() if m else "")
     if len(location) > 80:
         location = location[:80].rsplit(" ", 1)[0]
 
-    reqs: List[str] = []
-    low = user_input.lower()
-    for k in ["tools","screws","nails","paint","lumber","electrical","plumbing","hardware",
-              "supplies","equipment","drill","drill bits"]:
-        if k in low and k not in reqs:
-            reqs.append(k)
+    # One pass over the text; report keywords in their canonical order as before
+    found = set(_REQUIREMENT_RE.findall(user_input.lower()))
+    if "drill bits" in found:
+        found.add("drill")
+    reqs: List[str] = [k for k in _REQUIREMENT_KEYWORDS if k in found]
     return location, reqs
 
+_UTC = timezone.utc
+
 # ---------------- Protocol ----------------
 store_proto = Protocol(name="store_finder_protocol", version="1.0")
 
 # ---------------- Core ----------------
 class StoreFinderCore:
     def __init__(self):
-        self.config = Config()
+        self.config = get_config()
         if not self.config.validate():
             raise ValueError("Invalid configuration. Check your API keys.")
-        self.yelp = YelpAPI(self.config.get_yelp_api_key())
-        self.claude = AnthropicAgent(self.config.get_anthropic_api_key())
+        self.yelp = AsyncYelpAPI(self.config.yelp_api_key)
+        self.claude = AnthropicAgent(self.config.anthropic_api_key)
+
+    async def close(self) -> None:
+        """Release the pooled Yelp session; call once when the agent stops."""
+        await self.yelp.close()
 
-    def search(self, req: StoreSearchRequest) -> StoreSearchResponse:
-        now = datetime.now().isoformat()
+    async def search(self, req: StoreSearchRequest) -> StoreSearchResponse:
+        now = datetime.now(_UTC).isoformat(timespec="seconds")
         try:
-            results: List[HardwareStore] = self.yelp.search_hardware_stores(
+            results: List[HardwareStore] = await self.yelp.search_hardware_stores(
                 location=req.location, radius=req.radius, limit=req.limit
             )
             if not results:
@@ -87,21 +99,28 @@ class StoreFinderCore:
                     error_message="No results found", timestamp=now,
                 )
 
-            ai = self.claude.process_hardware_store_query(
+            # The formatter only blocks when it calls the LLM; keep that off the loop
+            format_kwargs = dict(
                 location=req.location,
                 requirements=req.requirements or [],
                 hardware_stores=results,
             )
-
-            top: List[dict] = []
-            for s in results[:5]:
-                top.append({
+            if self.claude.use_llm:
+                ai = await asyncio.to_thread(self.claude.process_hardware_store_query, **format_kwargs)
+            else:
+                ai = self.claude.process_hardware_store_query(**format_kwargs)
+
+            # quote_plus escapes &, #, ? and non-ASCII that would break the query string
+            top: List[dict] = [
+                {
                     "name": s.name, "address": s.address, "city": s.city, "state": s.state,
                     "zip_code": s.zip_code, "phone": s.phone, "rating": s.rating,
                     "review_count": s.review_count, "distance": s.distance, "url": s.url,
                     "categories": s.categories,
-                    "google_maps": f"https://www.google.com/maps/search/?api=1&query={s.name.replace(' ','+')}+{s.address.replace(' ','+')}",
-                })
+                    "google_maps": f"https://www.google.com/maps/search/?api=1&query={quote_plus(f'{s.name} {s.address}')}",
+                }
+                for s in results[:5]
+            ]
 
             return StoreSearchResponse(
                 success=True, stores_found=len(results), stores=top,
@@ -123,7 +142,7 @@ core = StoreFinderCore()
 @store_proto.on_message(model=StoreSearchRequest, replies=StoreSearchResponse)
 async def handle_store_search(ctx: Context, sender: str, msg: StoreSearchRequest):
     ctx.logger.info(f"[STORE] request from {sender} | location='{msg.location}' | reqs={msg.requirements}")
-    resp = core.search(msg)
+    resp = await core.search(msg)
     await ctx.send(sender, resp)
     ctx.logger.info("[STORE] response sent")
 
@@ -153,6 +172,10 @@ async def _startup(ctx: Context):
         agent.address,
     )
 
+@agent.on_event("shutdown")
+async def _shutdown(ctx: Context):
+    await core.close()
+
 if __name__ == "__main__":
     print("Backend address:", agent.address)
     enc = quote(LOCAL_BASE, safe="")
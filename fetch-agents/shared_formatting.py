@@ -0,0 +1,48 @@
+# shared_formatting.py — chat rendering of tutorial responses
+from __future__ import annotations
+from functools import lru_cache
+from typing import Any, List, Optional, Sequence, Tuple
+
+
+def format_tutorial_markdown(resp: Any) -> str:
+    """Markdown chat reply for a GenerateResponse-like object (title, steps, tools, ...)."""
+    return _format_cached(
+        resp.title,
+        tuple(resp.steps or ()),
+        _as_tuple(resp.tools),
+        _as_tuple(resp.products),
+        _as_tuple(resp.assumptions),
+        _as_tuple(resp.tips),
+    )
+
+
+def _as_tuple(items: Optional[Sequence[str]]) -> Tuple[str, ...]:
+    return tuple(items) if items else ()
+
+
+# The response cache hands back the same tutorial repeatedly; render it once
+@lru_cache(maxsize=256)
+def _format_cached(
+    title: str,
+    steps: Tuple[str, ...],
+    tools: Tuple[str, ...],
+    products: Tuple[str, ...],
+    assumptions: Tuple[str, ...],
+    tips: Tuple[str, ...],
+) -> str:
+    lines: List[str] = [f"**{title}**", ""]
+    if tools or products:
+        lines.append("**Tools & Products**")
+        lines.extend(f"{n}. {x}" for n, x in enumerate(tools + products, 1))
+        lines.append("")
+    lines.append("**Steps**")
+    lines.extend(f"{i}. {step}" for i, step in enumerate(steps, 1))
+    if assumptions:
+        lines.append("")
+        lines.append("**Assumptions**")
+        lines.extend(f"{i}. {a}" for i, a in enumerate(assumptions, 1))
+    if tips:
+        lines.append("")
+        lines.append("**Tips**")
+        lines.extend(f"{i}. {t}" for i, t in enumerate(tips, 1))
+    return "\n".join(lines)
@@ -0,0 +1,39 @@
+# shared_models.py — tutorial protocol messages shared by hs_agent, tutorial_agent and hs_client
+from __future__ import annotations
+from typing import List, Optional
+
+from uagents import Model
+
+# Input bounds for a tutorial request; longer text is cut before it reaches the LLM
+MAX_PROMPT_CHARS = 2000
+MAX_TRANSCRIPT_CHARS = 8000
+_CLIP_MARKER = "\n[...]\n"
+
+def clip_prompt(prompt: Optional[str]) -> str:
+    return (prompt or "")[:MAX_PROMPT_CHARS]
+
+def clip_transcript(transcript: Optional[str]) -> str:
+    """Keep the head and tail of an over-long transcript; the latest context matters most."""
+    transcript = transcript or ""
+    if len(transcript) <= MAX_TRANSCRIPT_CHARS:
+        return transcript
+    keep = (MAX_TRANSCRIPT_CHARS - len(_CLIP_MARKER)) // 2
+    return transcript[:keep] + _CLIP_MARKER + transcript[-keep:]
+
+
+class GenerateRequest(Model):
+    prompt: str
+    transcript: Optional[str] = None
+    style: Optional[str] = "concise"
+    max_steps: Optional[int] = None
+
+class GenerateResponse(Model):
+    title: str
+    steps: List[str]
+    assumptions: Optional[List[str]] = None
+    tips: Optional[List[str]] = None
+    tools: Optional[List[str]] = None
+    products: Optional[List[str]] = None
+
+class ErrorResponse(Model):
+    message: str
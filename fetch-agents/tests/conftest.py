@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The agents import their sibling modules by plain name (e.g. `from hs_model import ...`)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
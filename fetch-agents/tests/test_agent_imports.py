@@ -0,0 +1,14 @@
+import importlib
+
+import pytest
+
+pytest.importorskip("uagents")
+pytest.importorskip("uagents_core")
+
+
+@pytest.mark.parametrize("module_name", ["hs_agent", "tutorial_agent"])
+def test_agent_module_imports(module_name):
+    # Importing builds the agent and includes its protocols, which is where
+    # an unverifiable chat protocol used to raise
+    module = importlib.import_module(module_name)
+    assert module.agent is not None
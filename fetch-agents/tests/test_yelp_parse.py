@@ -0,0 +1,30 @@
+import pytest
+
+pytest.importorskip("aiohttp")
+
+import yelp_client
+from yelp_client import AsyncYelpAPI
+
+
+def test_null_distance_in_dict_path():
+    store = AsyncYelpAPI._parse_business(None, {"name": "Ace", "distance": None})
+    assert store.distance == 0.0
+
+
+@pytest.mark.skipif(yelp_client._SEARCH_DECODER is None, reason="msgspec not installed")
+def test_null_distance_in_struct_path():
+    body = yelp_client._SEARCH_DECODER.decode(b'{"businesses": [{"name": "Ace", "distance": null}]}')
+    assert AsyncYelpAPI._parse_business_struct(body.businesses[0]).distance == 0.0
+
+
+@pytest.mark.skipif(yelp_client._SEARCH_DECODER is None, reason="msgspec not installed")
+def test_null_name_and_category_title_in_struct_path():
+    body = yelp_client._SEARCH_DECODER.decode(
+        b'{"businesses": [{"name": null, "url": null, "categories": [{"title": null}]}]}'
+    )
+    business = body.businesses[0]
+    assert AsyncYelpAPI._is_hardware_struct(business) is False
+    store = AsyncYelpAPI._parse_business_struct(business)
+    assert store.name == ""
+    assert store.url == ""
+    assert store.categories == [""]
@@ -1,7 +1,5 @@
 from __future__ import annotations
-from typing import List, Optional, Dict, Any
-import os
-import json
+from typing import List, Optional
 
 from pydantic import BaseModel
 from uagents import Agent, Context, Protocol, Model, Bureau
@@ -18,22 +16,11 @@ from uagents_core.contrib.protocols.chat import (
     EndSessionContent,
     StartSessionContent,
 )
+from chat_compat import chat_protocol_from_spec
+from hs_model import llm_generate_steps
+from shared_models import GenerateRequest, GenerateResponse, ErrorResponse
 
 # ----- Models -----
-class GenerateRequest(Model):
-    prompt: str
-    transcript: Optional[str] = None
-    style: Optional[str] = "concise"
-    max_steps: Optional[int] = None
-
-class GenerateResponse(Model):
-    title: str
-    steps: List[str]
-    assumptions: Optional[List[str]] = None
-    tips: Optional[List[str]] = None
-    tools: Optional[List[str]] = None
-    products: Optional[List[str]] = None
-
 class StoreSearchRequest(BaseModel):
     location: str
     requirements: Optional[List[str]] = None
@@ -55,10 +42,9 @@ class TutorialResponse(BaseModel):
     tools: Optional[List[str]] = None
     products: Optional[List[str]] = None
 
-class ErrorResponse(Model):
-
-
-    message: str
+# llm_generate_steps already coerces every field, so the REST reply skips
+# re-validation (pydantic v2 renamed construct() to model_construct())
+_construct_tutorial = getattr(TutorialResponse, "model_construct", None) or TutorialResponse.construct
 
 # ----- Tutorial Protocol -----
 tutorial_proto = Protocol(name="house_tutorial_protocol", version="1.0")
@@ -67,7 +53,7 @@ tutorial_proto = Protocol(name="house_tutorial_protocol", version="1.0")
 async def handle_tutorial(ctx: Context, sender: str, msg: GenerateRequest):
     ctx.logger.info(f"📥 RECEIVED from {sender} | prompt='{(msg.prompt or '')[:80]}'")
     try:
-        data = llm_generate_steps(
+        data = await llm_generate_steps(
             msg.prompt, msg.transcript, msg.style or "concise", msg.max_steps
         )
         await ctx.send(sender, GenerateResponse(
@@ -94,40 +80,17 @@ agent = Agent(
 # Include our tutorial protocol (publish so others can discover it)
 agent.include(tutorial_proto, publish_manifest=True)
 
-# === 🔧 Convert chat_protocol_spec → Protocol for older/newer versions ===
-def _chat_as_protocol(spec):
-    # Try common constructors across uagents/uagents_core versions
-    for attr in ("to_protocol", "as_protocol", "build", "create_protocol"):
-        fn = getattr(spec, attr, None)
-        if callable(fn):
-            try:
-                return fn()
-            except Exception:
-                pass
-    # Try the uAgents helper if available
-    try:
-        return Protocol.from_spec(spec)  # some versions provide this
-    except Exception:
-        return None
-
-_chat_proto = _chat_as_protocol(chat_protocol_spec)
-if _chat_proto is not None:
-    agent.include(_chat_proto, publish_manifest=True)
-else:
-    # Fallback: don't publish the chat spec (handlers still work, but Inspector chat may be disabled)
-    print(" Could not convert chat_protocol_spec to Protocol. Chat manifest not published.")
-
 # ----- Minimal Chat Handlers -----
-@agent.on_message(model=ChatMessage, replies={ChatAcknowledgement, ChatMessage})
 async def handle_chat(ctx: Context, sender: str, msg: ChatMessage):
     await ctx.send(sender, ChatAcknowledgement(acknowledged_msg_id=getattr(msg, "msg_id", None)))
 
-    texts = []
-    for part in msg.content:
-        if isinstance(part, TextContent) and (part.text or "").strip():
-            texts.append(part.text.strip())
+    # Only whether any text was sent matters; stop at the first one
+    has_text = any(
+        isinstance(part, TextContent) and (part.text or "").strip()
+        for part in (msg.content or ())
+    )
 
-    if texts:
+    if has_text:
         reply = ("Hi! I'm your House-Services guide. Tell me what you're fixing and I'll "
                  "generate a step-by-step plan plus a tools/products list.")
     else:
@@ -135,126 +98,29 @@ async def handle_chat(ctx: Context, sender: str, msg: ChatMessage):
 
     await ctx.send(sender, ChatMessage(content=[TextContent(type="text", text=reply)]))
 
-# -------- Model Import -------
-
-ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
-ANTHROPIC_MODEL = os.getenv("ANTHROPIC_MODEL", "claude-3-5-sonnet-latest")
-
-def _fallback(prompt: str, transcript: Optional[str], max_steps: int) -> Dict[str, Any]:
-    base_steps = [
-        "Shut off relevant utilities (water/power/gas). Wear basic PPE.",
-        "Gather simple tools and materials you likely have at home.",
-        "Prepare the area and protect nearby surfaces.",
-        "Perform the core fix in small, verifiable steps.",
-        "Test the result and check for leaks/noise/looseness.",
-        "Clean up; restore utilities; note when to call a pro.",
-    ]
-    tools = [
-        "Adjustable wrench", "Pliers", "Screwdrivers", "Bucket/towels",
-        "Plumber's tape (PTFE)", "Utility knife"
-    ]
-    products = [
-        "Replacement part (washer/gasket/cartridge as applicable)",
-        "Mild cleaner or vinegar", "Rags or paper towels"
-    ]
-    return {
-        "title": f"How to: {prompt[:60] if prompt else 'Home Task'}",
-        "steps": base_steps[: (max_steps or 8)],
-        "assumptions": ["Beginner user; renter-friendly approach; typical household fixtures."],
-        "tips": [
-            "Work slowly; stop if unsure; take photos before disassembly.",
-            "Escalate to a professional for damaged valves, gas odors, or wiring faults."
-        ],
-        "tools": tools,
-        "products": products,
-    }
-
-def _anthropic_json(system_prompt: str, user_prompt: str) -> Dict[str, Any]:
-    if not ANTHROPIC_API_KEY:
-        return {}
-    try:
-        from anthropic import Anthropic  # pip install anthropic
-        client = Anthropic(api_key=ANTHROPIC_API_KEY)
-        msg = client.messages.create(
-            model=ANTHROPIC_MODEL,
-            max_tokens=1100,
-            temperature=0.2,
-            system=system_prompt,
-            messages=[{"role": "user", "content": user_prompt}],
-        )
-        text = "".join(getattr(p, "text", "") for p in msg.content)
-        i, j = text.find("{"), text.rfind("}")
-        if i == -1 or j == -1 or j < i:
-            return {}
-        return json.loads(text[i:j+1])
-    except Exception:
-        return {}
-
-def llm_generate_steps(
-    prompt: str,
-    transcript: Optional[str] = None,
-    style: str = "concise",
-    max_steps: Optional[int] = None,
-) -> Dict[str, Any]:
-    # House-Services Guide — safety-forward, renter-friendly, with tools/products
-    system_prompt = (
-        "You are a House-Services Guide for home maintenance and repair. "
-        "Goals: (1) safety first, (2) household best practices, (3) renter-friendly options, "
-        "(4) clear, testable steps.\n\n"
-        "INPUTS:\n"
-        "- User goal.\n"
-        "- Optional transcript with extra context.\n\n"
-        "OUTPUT (JSON only): {title, steps[], assumptions[], tips[], tools[], products[]}\n"
-        "STYLE & PRIORITIES:\n"
-        "• Safety first (PPE, shutoffs, hazards). Include a verification step.\n"
-        "• Renter-friendly, non-destructive where possible.\n"
-        "• Steps: short, imperative, verifiable. Keep at most 'max_steps'.\n"
-        "• Tools/products: the minimal realistic list for a beginner.\n"
-        "• Tips: common pitfalls; 1-3 escalation cases when to call a professional.\n\n"
-        "CONTEXT (use verbatim when helpful):\n"
-        f"{(transcript or '').strip()}\n\n"
-        "Return valid JSON only, with no extra commentary."
-    )
-
-    schema = {
-        "type": "object",
-        "properties": {
-            "title": {"type": "string"},
-            "steps": {"type": "array", "items": {"type": "string"}},
-            "assumptions": {"type": "array", "items": {"type": "string"}},
-            "tips": {"type": "array", "items": {"type": "string"}},
-            "tools": {"type": "array", "items": {"type": "string"}},
-            "products": {"type": "array", "items": {"type": "string"}},
-        },
-        "required": ["title", "steps"],
-    }
-    payload = {"goal": prompt, "style": style, "max_steps": max_steps}
-    user_prompt = (
-        "Schema:\n" + json.dumps(schema) + "\n\n"
-        "Payload:\n" + json.dumps(payload) + "\n\n"
-        "Write JSON matching the schema. Keep steps <= max_steps."
-    )
-
-    data = _anthropic_json(system_prompt, user_prompt)
-    if not data or not isinstance(data, dict) or not data.get("steps"):
-        return _fallback(prompt, transcript, max_steps)
+async def handle_chat_ack(ctx: Context, sender: str, msg: ChatAcknowledgement):
+    pass
 
-    # Coerce & cap
-    data["title"] = str(data.get("title", f"How to: {prompt[:60]}"))
-    if max_steps:
-        data["steps"] = [str(s).strip() for s in data.get("steps", [])][:max_steps]
-    else:
-        data["steps"] = [str(s).strip() for s in data.get("steps", [])]
-    for k in ("assumptions", "tips", "tools", "products"): 
-        if data.get(k):
-            data[k] = [str(x).strip() for x in data[k]]
-    return data
+# === 🔧 Convert chat_protocol_spec → Protocol for older/newer versions ===
+_chat_proto = chat_protocol_from_spec(chat_protocol_spec)
+if _chat_proto is not None:
+    # A spec protocol only passes verification once every message it
+    # defines has a handler, so register them before including it
+    _chat_proto.on_message(ChatMessage)(handle_chat)
+    _chat_proto.on_message(ChatAcknowledgement)(handle_chat_ack)
+    agent.include(_chat_proto, publish_manifest=True)
+else:
+    # Fallback: don't publish the chat spec (handlers still work, but Inspector chat may be disabled)
+    print(" Could not convert chat_protocol_spec to Protocol. Chat manifest not published.")
+    agent.on_message(model=ChatMessage, replies={ChatAcknowledgement, ChatMessage})(handle_chat)
 
 @agent.on_rest_post(endpoint="/tutorial-agent", request=APIRequest, response=TutorialResponse)
 async def handle_tutorial_api(ctx: Context, req: APIRequest):
     ctx.logger.info(f"📥 RECEIVED from {req} | prompt='{(req.prompt or '')[:80]}'")
     try:
-        data = llm_generate_steps(
+        # Awaiting the async LLM call keeps other requests, chat messages and
+        # acks on this agent flowing while Claude responds
+        data = await llm_generate_steps(
             req.prompt, req.transcript, req.style or "concise", req.max_steps
         )
 
@@ -270,7 +136,7 @@ async def handle_tutorial_api(ctx: Context, req: APIRequest):
         ctx.logger.info(f"Sent StoreSearchRequest to STORE_FINDER_AGENT | location: {req.address} | tools: {data.get('tools', [])}")
 
         # return API response
-        return TutorialResponse(
+        return _construct_tutorial(
             title=data.get("title", "Home Tutorial"),
             steps=list(data.get("steps", [])),
             assumptions=data.get("assumptions"),
@@ -2,15 +2,45 @@
 Yelp API integration module for finding hardware stores.
 """
 
-import requests
+import asyncio
+import json
 import os
-from typing import List, Dict, Optional
+import re
+import sqlite3
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, List, Dict, Optional, Tuple
+from urllib.parse import urlencode
 from dataclasses import dataclass
+from functools import lru_cache
 
+import aiohttp
 
-@dataclass
+# Optional: orjson decodes Yelp's business lists several times faster than json
+try:
+    import orjson
+except Exception:  # pragma: no cover
+    orjson = None  # type: ignore
+
+# Both accept the raw response bytes
+_loads = orjson.loads if orjson is not None else json.loads
+
+# Optional: msgspec decodes search bodies straight into slotted structs,
+# skipping the nested dicts for every business
+try:
+    import msgspec
+except Exception:  # pragma: no cover
+    msgspec = None  # type: ignore
+
+# Decode failures from any of the parsers above
+_DECODE_ERRORS = (ValueError, msgspec.DecodeError) if msgspec is not None else (ValueError,)
+
+
+@dataclass(slots=True, frozen=True)
 class HardwareStore:
-    """Data class representing a hardware store."""
+    """Data class representing a hardware store (immutable, no per-instance __dict__)."""
     name: str
     address: str
     city: str
@@ -24,18 +54,219 @@ class HardwareStore:
     categories: List[str]
 
 
-class YelpAPI:
-    """Yelp API client for searching hardware stores."""
+METERS_PER_MILE = 1609.34
+
+if msgspec is not None:
+    # Only the fields _parse_business reads. Defaults match the dict path's
+    # .get() defaults; Optional keeps explicit nulls from failing the decode
+    class YelpCategory(msgspec.Struct):
+        title: Optional[str] = ""
+
+    class YelpLocation(msgspec.Struct):
+        city: Optional[str] = ""
+        state: Optional[str] = ""
+        zip_code: Optional[str] = ""
+        display_address: List[str] = []
+
+    class YelpBusiness(msgspec.Struct):
+        name: Optional[str] = ""
+        display_phone: Optional[str] = ""
+        rating: Optional[float] = 0.0
+        review_count: Optional[int] = 0
+        distance: Optional[float] = 0.0
+        url: Optional[str] = ""
+        categories: List[YelpCategory] = []
+        location: YelpLocation = msgspec.field(default_factory=YelpLocation)
+
+    class YelpSearchResponse(msgspec.Struct):
+        businesses: List[YelpBusiness] = []
+
+    _SEARCH_DECODER = msgspec.json.Decoder(YelpSearchResponse)
+else:
+    _SEARCH_DECODER = None
+
+
+# Concurrent connections to Yelp and per-request time budget
+YELP_MAX_CONNECTIONS = 20
+YELP_TIMEOUT = 10  # seconds
+YELP_KEEPALIVE = 60  # seconds an idle pooled connection is kept open
+
+# Rate limits and transient server errors are retried with exponential backoff,
+# honoring Retry-After; a longer requested wait gives up (stale cache may answer)
+YELP_MAX_RETRIES = 3
+YELP_BACKOFF = 0.5  # seconds, doubled per attempt
+YELP_MAX_RETRY_WAIT = 10.0  # seconds
+_RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+def _retry_delay(retry_after: Optional[str], attempt: int) -> Optional[float]:
+    """Seconds to wait before the next attempt, or None if it isn't worth waiting."""
+    delay = YELP_BACKOFF * (2 ** attempt)
+    if retry_after:
+        try:
+            delay = float(retry_after)
+        except ValueError:
+            # HTTP-date form
+            try:
+                delay = (parsedate_to_datetime(retry_after) - datetime.now(timezone.utc)).total_seconds()
+            except (TypeError, ValueError):
+                pass
+    delay = max(delay, 0.0)
+    return delay if delay <= YELP_MAX_RETRY_WAIT else None
+
+# Persistent response cache; set YELP_CACHE_PATH to "" to disable it
+YELP_CACHE_PATH = os.getenv("YELP_CACHE_PATH", "yelp_cache.sqlite")
+YELP_CACHE_TTL = float(os.getenv("YELP_CACHE_TTL", "86400"))  # seconds
+
+
+# Hardware store related terms; the first three make up the search term
+HARDWARE_TERMS = (
+    "hardware store", "home improvement", "tools", "lumber",
+    "building supplies", "electrical supplies", "plumbing supplies",
+    "paint", "hardware", "construction supplies"
+)
+_SEARCH_TERM = "+".join(HARDWARE_TERMS[:3])
+
+# Category titles containing any of these mark a hardware store
+HARDWARE_KEYWORDS = (
+    "hardware", "home improvement", "building supplies",
+    "tools", "lumber", "electrical", "plumbing", "paint"
+)
+_HARDWARE_RE = re.compile("|".join(map(re.escape, HARDWARE_KEYWORDS)))
+
+
+@lru_cache(maxsize=1024)
+def _is_hardware_category(title: str) -> bool:
+    # Yelp reuses a small set of category titles, so most checks are cache hits
+    return _HARDWARE_RE.search(title.lower()) is not None
+
+
+# Parsed search results kept in memory, in front of the disk cache
+SEARCH_CACHE_TTL = float(os.getenv("YELP_SEARCH_CACHE_TTL", "3600"))  # seconds
+SEARCH_CACHE_MAX = 256
+
+
+def _cache_key(path: str, params: Optional[Dict[str, Any]]) -> str:
+    # Sorted so the same query always maps to the same entry
+    return f"{path}?{urlencode(sorted((params or {}).items()))}"
+
+
+class _DiskCache:
+    """SQLite store of raw Yelp GET bodies, shared across runs."""
+    
+    def __init__(self, path: str, ttl: float):
+        self.ttl = ttl
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses "
+                "(key TEXT PRIMARY KEY, stored_at REAL NOT NULL, body BLOB NOT NULL)"
+            )
+    
+    def get(self, key: str, allow_stale: bool = False) -> Optional[bytes]:
+        row = self._db.execute(
+            "SELECT stored_at, body FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        if not allow_stale and time.time() - row[0] >= self.ttl:
+            return None
+        return row[1]
+    
+    def put(self, key: str, body: bytes) -> None:
+        with self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, stored_at, body) VALUES (?, ?, ?)",
+                (key, time.time(), body),
+            )
+
+
+class AsyncYelpAPI:
+    """Async Yelp API client for searching hardware stores.
+    
+    Calls share one aiohttp session, so concurrent lookups overlap instead of
+    blocking the event loop one after another.
+    """
     
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, cache_path: Optional[str] = YELP_CACHE_PATH):
         self.api_key = api_key
         self.base_url = "https://api.yelp.com/v3"
         self.headers = {
             "Authorization": f"Bearer {api_key}",
             "Content-Type": "application/json"
         }
+        self._session: Optional[aiohttp.ClientSession] = None
+        # Single-row lookups on a local file; cheap enough to run on the loop
+        self._cache = _DiskCache(cache_path, YELP_CACHE_TTL) if cache_path else None
+        # (location, radius, limit, sort_by) -> (stored_at, stores), least recently used first
+        self._search_cache: "OrderedDict[Tuple, Tuple[float, Tuple[HardwareStore, ...]]]" = OrderedDict()
+    
+    async def _ensure_session(self) -> aiohttp.ClientSession:
+        # Created lazily: a ClientSession must be opened inside the running loop
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                headers=self.headers,
+                # Keep idle connections (and the resolved address) around long
+                # enough that follow-up searches skip the TCP/TLS handshake
+                connector=aiohttp.TCPConnector(
+                    limit=YELP_MAX_CONNECTIONS,
+                    keepalive_timeout=YELP_KEEPALIVE,
+                    ttl_dns_cache=300,
+                ),
+                timeout=aiohttp.ClientTimeout(total=YELP_TIMEOUT),
+            )
+        return self._session
+    
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+    
+    async def _fetch(self, path: str, params: Optional[Dict[str, Any]]) -> bytes:
+        """Raw body of a GET, retrying rate limits and transient server errors."""
+        session = await self._ensure_session()
+        url = f"{self.base_url}{path}"
+        for attempt in range(YELP_MAX_RETRIES + 1):
+            async with session.get(url, params=params) as response:
+                delay = None
+                if response.status in _RETRY_STATUSES and attempt < YELP_MAX_RETRIES:
+                    delay = _retry_delay(response.headers.get("Retry-After"), attempt)
+                if delay is None:
+                    response.raise_for_status()
+                    return await response.read()
+            # Sleep after the response is released so the connection goes back to the pool
+            await asyncio.sleep(delay)
+    
+    async def _get_json(
+        self,
+        path: str,
+        params: Optional[Dict[str, Any]] = None,
+        decode: Callable[[bytes], Any] = _loads
+    ) -> Any:
+        """GET a Yelp endpoint, reusing a cached body for repeat queries.
+        
+        If Yelp fails (rate limit, outage), the last good body is returned even
+        when it has expired; without one the error is raised.
+        """
+        key = _cache_key(path, params)
+        if self._cache is not None:
+            body = self._cache.get(key)
+            if body is not None:
+                return decode(body)
+        
+        try:
+            body = await self._fetch(path, params)
+            data = decode(body)
+        except (aiohttp.ClientError, asyncio.TimeoutError, *_DECODE_ERRORS):
+            stale = self._cache.get(key, allow_stale=True) if self._cache is not None else None
+            if stale is None:
+                raise
+            return decode(stale)
+        
+        if self._cache is not None:
+            self._cache.put(key, body)
+        return data
     
-    def search_hardware_stores(
+    async def search_hardware_stores(
         self, 
         location: str, 
         radius: int = 10000, 
@@ -54,18 +285,15 @@ class YelpAPI:
         Returns:
             List of HardwareStore objects
         """
-        # Hardware store related terms
-        hardware_terms = [
-            "hardware store", "home improvement", "tools", "lumber",
-            "building supplies", "electrical supplies", "plumbing supplies",
-            "paint", "hardware", "construction supplies"
-        ]
-        
-        # Combine terms for better search results
-        search_term = "+".join(hardware_terms[:3])  # Use first 3 terms
+        # Case and spacing don't change the search
+        key = (" ".join(location.lower().split()), radius, limit, sort_by)
+        hit = self._search_cache.get(key)
+        if hit is not None and time.monotonic() - hit[0] < SEARCH_CACHE_TTL:
+            self._search_cache.move_to_end(key)
+            return list(hit[1])
         
         params = {
-            "term": search_term,
+            "term": _SEARCH_TERM,
             "location": location,
             "radius": radius,
             "limit": limit,
@@ -74,43 +302,35 @@ class YelpAPI:
         }
         
         try:
-            response = requests.get(
-                f"{self.base_url}/businesses/search",
-                headers=self.headers,
-                params=params
-            )
-            response.raise_for_status()
+            # The "homeandgarden" category also brings back nurseries, furniture
+            # and the like, so keep only hardware-related businesses, in one pass
+            if _SEARCH_DECODER is not None:
+                result = await self._get_json("/businesses/search", params, _SEARCH_DECODER.decode)
+                is_hardware, parse = self._is_hardware_struct, self._parse_business_struct
+                businesses = result.businesses
+            else:
+                data = await self._get_json("/businesses/search", params)
+                is_hardware, parse = self._is_hardware_store, self._parse_business
+                businesses = data.get("businesses", ())
+            stores = tuple(parse(business) for business in businesses if is_hardware(business))
             
-            data = response.json()
-            businesses = data.get("businesses", [])
-            
-            hardware_stores = []
-            for business in businesses:
-                # Filter for hardware-related businesses
-                if self._is_hardware_store(business):
-                    store = self._parse_business(business)
-                    hardware_stores.append(store)
-            
-            return hardware_stores
-            
-        except requests.exceptions.RequestException as e:
+        except (aiohttp.ClientError, asyncio.TimeoutError, *_DECODE_ERRORS) as e:
             print(f"Error calling Yelp API: {e}")
             return []
+        
+        # Stores are frozen, so the cached tuple can be shared; callers get their own list
+        self._search_cache[key] = (time.monotonic(), stores)
+        self._search_cache.move_to_end(key)
+        if len(self._search_cache) > SEARCH_CACHE_MAX:
+            self._search_cache.popitem(last=False)
+        return list(stores)
     
     def _is_hardware_store(self, business: Dict) -> bool:
         """Check if a business is a hardware store based on categories."""
-        categories = business.get("categories", [])
-        hardware_keywords = [
-            "hardware", "home improvement", "building supplies", 
-            "tools", "lumber", "electrical", "plumbing", "paint"
-        ]
-        
-        for category in categories:
-            category_title = category.get("title", "").lower()
-            if any(keyword in category_title for keyword in hardware_keywords):
-                return True
-        
-        return False
+        return any(
+            _is_hardware_category(category.get("title") or "")
+            for category in business.get("categories", [])
+        )
     
     def _parse_business(self, business: Dict) -> HardwareStore:
         """Parse Yelp business data into HardwareStore object."""
@@ -129,21 +349,39 @@ class YelpAPI:
             phone=business.get("display_phone", ""),
             rating=business.get("rating", 0.0),
             review_count=business.get("review_count", 0),
-            distance=business.get("distance", 0.0) / 1609.34,  # Convert meters to miles
+            distance=(business.get("distance") or 0.0) / METERS_PER_MILE,
             url=business.get("url", ""),
             categories=categories
         )
     
-    def get_business_details(self, business_id: str) -> Optional[Dict]:
+    @staticmethod
+    def _is_hardware_struct(business: "YelpBusiness") -> bool:
+        return any(_is_hardware_category(category.title or "") for category in business.categories)
+    
+    @staticmethod
+    def _parse_business_struct(business: "YelpBusiness") -> HardwareStore:
+        """Same as _parse_business, reading attributes of a decoded YelpBusiness."""
+        location = business.location
+        # Optional fields may hold an explicit null; fall back to the dict path's defaults
+        return HardwareStore(
+            name=business.name or "",
+            address=" ".join(location.display_address),
+            city=location.city or "",
+            state=location.state or "",
+            zip_code=location.zip_code or "",
+            phone=business.display_phone or "",
+            rating=business.rating or 0.0,
+            review_count=business.review_count or 0,
+            distance=(business.distance or 0.0) / METERS_PER_MILE,
+            url=business.url or "",
+            categories=[category.title or "" for category in business.categories]
+        )
+    
+    async def get_business_details(self, business_id: str) -> Optional[Dict]:
         """Get detailed information about a specific business."""
         try:
-            response = requests.get(
-                f"{self.base_url}/businesses/{business_id}",
-                headers=self.headers
-            )
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
+            return await self._get_json(f"/businesses/{business_id}")
+        except (aiohttp.ClientError, asyncio.TimeoutError, *_DECODE_ERRORS) as e:
             print(f"Error getting business details: {e}")
             return None
 
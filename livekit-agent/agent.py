@@ -1,4 +1,7 @@
+import asyncio
 import json
+import logging
+from typing import List, Optional
 from livekit.agents import (
     Agent,
     AgentSession,
@@ -7,11 +10,61 @@ from livekit.agents import (
     cli,
     UserInputTranscribedEvent
 )
+# Plugins register themselves on import, which LiveKit requires on the main thread
 from livekit.plugins import deepgram
 from dotenv import load_dotenv
 
 load_dotenv(".env.local")
 
+logger = logging.getLogger(__name__)
+
+# Optional: orjson returns bytes directly, saving the encode per transcript
+try:
+    import orjson
+except Exception:  # pragma: no cover
+    orjson = None  # type: ignore
+
+
+# Final transcripts arriving within this window go out in one data packet
+TRANSCRIPT_FLUSH_INTERVAL = 0.05  # seconds
+
+
+def _dumps(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode()
+
+
+# Optional: msgspec encodes typed structs straight to bytes, with no dict per transcript
+try:
+    import msgspec
+except Exception:  # pragma: no cover
+    msgspec = None  # type: ignore
+
+if msgspec is not None:
+    class TranscriptMsg(msgspec.Struct):
+        text: str
+        language: Optional[str] = None
+        type: str = "transcript"
+
+    class TranscriptBatch(msgspec.Struct):
+        items: List[TranscriptMsg]
+        type: str = "transcripts"
+
+    _ENC = msgspec.json.Encoder()
+
+    def _transcript_item(text: str, language: Optional[str]):
+        return TranscriptMsg(text=text, language=language)
+
+    def _encode_batch(items) -> bytes:
+        return _ENC.encode(TranscriptBatch(items=items))
+else:
+    def _transcript_item(text: str, language: Optional[str]):
+        return {"type": "transcript", "text": text, "language": language}
+
+    def _encode_batch(items) -> bytes:
+        return _dumps({"type": "transcripts", "items": items})
+
 
 async def entrypoint(ctx: JobContext):
     await ctx.connect()
@@ -24,22 +77,48 @@ async def entrypoint(ctx: JobContext):
         stt=deepgram.STT(model="nova-3"),
     )
 
+    # Resolved once; the publisher reuses it for every batch
+    local_participant = ctx.room.local_participant
+
+    # Final transcripts waiting to be published to the room
+    transcripts: asyncio.Queue = asyncio.Queue()
+
+    async def flush_transcripts():
+        while True:
+            # Block until the first segment, then give the rest of the burst a
+            # moment to arrive so they share one reliable send
+            items = [await transcripts.get()]
+            await asyncio.sleep(TRANSCRIPT_FLUSH_INTERVAL)
+            while not transcripts.empty():
+                items.append(transcripts.get_nowait())
+            try:
+                await local_participant.publish_data(
+                    payload=_encode_batch(items),
+                    reliable=True
+                )
+            except Exception as e:
+                logger.warning(f"[Transcript] publish failed: {e}")
+
+    flush_task = asyncio.create_task(flush_transcripts())
+
+    async def stop_flushing():
+        flush_task.cancel()
+
+    ctx.add_shutdown_callback(stop_flushing)
+
     # Listen for transcription events
     @session.on("user_input_transcribed")
     def on_user_input_transcribed(event: UserInputTranscribedEvent):
-        if event.is_final:  # Only print final transcripts (not interim)
-            print(f"[Transcript] {event.transcript}")
-            print(f"  Language: {event.language}")
-            if event.speaker_id:
-                print(f"  Speaker: {event.speaker_id}")
-            ctx.room.local_participant.publish_data(
-                payload=json.dumps({
-                    "type": "transcript",
-                    "text": event.transcript,
-                    "language": event.language
-                }).encode(),
-                reliable=True
+        # Interim results arrive many times a second; drop them before any other work
+        if not event.is_final:
+            return
+        # Logged at debug level: print would take the stdout lock on the audio path
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "[Transcript] %s | language=%s | speaker=%s",
+                event.transcript, event.language, event.speaker_id,
             )
+        transcripts.put_nowait(_transcript_item(event.transcript, event.language))
 
     await session.start(agent=agent, room=ctx.room)
     # await session.generate_reply(instructions="greet the user and ask about their day")